@@ -1,22 +1,54 @@
 # __init__.py
-import bpy
+try:
+    import bpy
+except ImportError:
+    # Imported outside Blender, e.g. for the headless readers and sampler
+    bpy = None
 
-from . import ui,log
-from .anim.operator import ImportAnimClass
-from .mesh_map.operator import ImportMeshMapClass
-from .mesh_prop.operator import ImportMeshPropClass
-from .mesh_wcm.operator import ImportMeshWCMClass
-from .skel.operator import ImportSkelClass
+if bpy is not None:
+    from . import ui,log
+    from .anim.operator import ImportAnimClass
+    from .batch.operator import ConvertBatchClass
+    from .catalog.operator import (
+        CatalogResultItem,
+        CatalogSettings,
+        ImportCatalogEntryClass,
+        ScanCatalogClass,
+        SearchCatalogClass,
+    )
+    from .lod.operator import ImportLodSetClass, SwapLodClass
+    from .mesh_map.operator import ExpandMapPlaceholdersClass, ImportMeshMapClass
+    from .mesh_prop.operator import ImportMeshPropClass
+    from .mesh_wcm.operator import ImportMeshWCMClass, WCMObjectItem
+    from .preview.operator import ImportPreviewClass, UpgradePreviewClass
+    from .reimport.operator import ReimportClass
+    from .watch.operator import WatchFolderClass, stop_watching
+    from .skel.operator import BindSkinClass, ImportSkelClass
 
-# Class list
-classes = (
-    ui.ImportPanel,
-    ImportMeshPropClass,
-    ImportMeshMapClass,
-    ImportMeshWCMClass,
-    ImportAnimClass,
-    ImportSkelClass,
-)
+    # Class list
+    classes = (
+        ui.ImportPanel,
+        ImportMeshPropClass,
+        ImportMeshMapClass,
+        ExpandMapPlaceholdersClass,
+        WCMObjectItem,
+        ImportMeshWCMClass,
+        ImportAnimClass,
+        ImportSkelClass,
+        BindSkinClass,
+        CatalogResultItem,
+        CatalogSettings,
+        ScanCatalogClass,
+        SearchCatalogClass,
+        ImportCatalogEntryClass,
+        ConvertBatchClass,
+        ReimportClass,
+        ImportLodSetClass,
+        SwapLodClass,
+        ImportPreviewClass,
+        UpgradePreviewClass,
+        WatchFolderClass,
+    )
 
 
 # Registration helpers
@@ -24,9 +56,12 @@ def register():
     """Register classes."""
     for cls in classes:
         bpy.utils.register_class(cls)
+    bpy.types.Scene.pmt_catalog = bpy.props.PointerProperty(type=CatalogSettings)
 
 
 def unregister():
     """Unregister classes."""
+    stop_watching()
+    del bpy.types.Scene.pmt_catalog
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
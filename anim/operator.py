@@ -1,16 +1,20 @@
 # anim\operator.py
+import json
 import os
-import struct
 
 import bmesh
 import bpy
+import numpy as np
 
+from . import reader
+from ..background import BackgroundImportMixin
+from ..cache import CachedImportMixin
+from ..builder import tag_object
 from ..log import log
-from .utils import is_valid_group_name, quat_to_eul
 
 
 # Operator definition
-class ImportAnimClass(bpy.types.Operator):
+class ImportAnimClass(CachedImportMixin, BackgroundImportMixin, bpy.types.Operator):
     """Import an game .anim file"""
 
     bl_idname = "import.anim"
@@ -25,6 +29,76 @@ class ImportAnimClass(bpy.types.Operator):
     # Extension filter
     filename_ext = ".anim"
     filter_glob: bpy.props.StringProperty(default="*.anim", options={"HIDDEN"})  # type: ignore
+    # What receives the keys
+    target: bpy.props.EnumProperty(
+        name="Target",
+        description="What the animation groups are applied to",
+        items=(
+            ("OBJECTS", "Proxy Objects", "Create an animated cube per group"),
+            ("ARMATURE", "Active Armature", "Key the pose bones of the active armature named like the groups"),
+        ),
+        default="OBJECTS",
+    )  # type: ignore
+    # First frame to import
+    frame_start: bpy.props.IntProperty(
+        name="Start Frame",
+        description="First frame of the file to import",
+        default=0,
+        min=0,
+    )  # type: ignore
+    # Last frame to import
+    frame_end: bpy.props.IntProperty(
+        name="End Frame",
+        description="Last frame of the file to import (-1 for the last frame)",
+        default=-1,
+        min=-1,
+    )  # type: ignore
+    # Import every nth frame
+    frame_step: bpy.props.IntProperty(
+        name="Frame Step",
+        description="Import every nth frame of the range",
+        default=1,
+        min=1,
+    )  # type: ignore
+    # Group name filter
+    group_filter: bpy.props.StringProperty(
+        name="Group Filter",
+        description="Glob patterns of groups to import, separated by commas",
+        default="*",
+    )  # type: ignore
+    # Retime keys to the scene frame rate
+    resample: bpy.props.BoolProperty(
+        name="Resample",
+        description="Resample the clip from its own frame rate to the scene frame rate",
+        default=False,
+    )  # type: ignore
+    # Frame rate the clip was authored at
+    source_fps: bpy.props.FloatProperty(
+        name="Source FPS",
+        description="Frame rate of the animation file",
+        default=30.0,
+        min=1.0,
+    )  # type: ignore
+    # Drop redundant keys
+    reduce_keys: bpy.props.BoolProperty(
+        name="Reduce Keyframes",
+        description="Remove static channels and keys that linear interpolation reproduces",
+        default=False,
+    )  # type: ignore
+    # Allowed error of reduced channels
+    reduce_tolerance: bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Largest allowed difference between reduced and original curves",
+        default=1e-4,
+        min=0.0,
+        precision=6,
+    )  # type: ignore
+    # Import in the background
+    background: bpy.props.BoolProperty(
+        name="Background Import",
+        description="Parse on a worker thread and add groups gradually (Esc to cancel)",
+        default=False,
+    )  # type: ignore
 
     # Show file selector
     def invoke(self, context, event):
@@ -54,212 +128,223 @@ class ImportAnimClass(bpy.types.Operator):
         # Extract file name without extension
         file_name = os.path.splitext(os.path.basename(file_path))[0]
 
-        # Parse animation data
-        vertex_groups = self.parse_anim_file(data, file_name)
-
-        # Determine total frame count
-        total_frames = max(len(group_data) for group_data in vertex_groups.values())
-        log.debug("Total frames: %s", total_frames)
-
-        # Set Blender scene frame range
-        bpy.context.scene.frame_start = 1
-        bpy.context.scene.frame_end = total_frames
-
-        # Create animation
-        for group_name, group_data in vertex_groups.items():
-            # Create a cube mesh
-            mesh = bpy.data.meshes.new(name=group_name)
-            # Create a cube object
-            obj = bpy.data.objects.new(name=group_name, object_data=mesh)
-            # Link to scene
-            context.collection.objects.link(obj)
-
-            # Make it active
-            bpy.context.view_layer.objects.active = obj
-            # Save current mode
-            current_mode = bpy.context.object.mode
-            # Ensure object mode
-            bpy.ops.object.mode_set(mode="OBJECT")
-
-            # Add cube data
-            bm = bmesh.new()
-            # Size 0.1
-            bmesh.ops.create_cube(bm, size=0.1)
-            bm.to_mesh(mesh)
-            bm.free()
-
-            # Restore mode
-            bpy.ops.object.mode_set(mode=current_mode)
-            # Update mesh
-            mesh.update()
-
-            # Insert location and rotation keyframes
-            for frame, transform in enumerate(group_data):
-                # Location keyframe
-                obj.location = transform["location"]
-                obj.keyframe_insert(data_path="location", frame=frame)
-
-                # Rotation keyframe (Euler)
-                obj.rotation_euler = transform["rotation"]
-                obj.keyframe_insert(data_path="rotation_euler", frame=frame)
-
+        # Reader options, read here since planning may run on a worker thread
+        render = context.scene.render
+        self._options = {
+            "frame_start": self.frame_start,
+            "frame_stop": None if self.frame_end < 0 else self.frame_end + 1,
+            "frame_step": self.frame_step,
+            "patterns": [p.strip() for p in self.group_filter.split(",") if p.strip()],
+            "source_fps": self.source_fps,
+            "target_fps": render.fps / render.fps_base if self.resample else None,
+            "tolerance": self.reduce_tolerance if self.reduce_keys else None,
+        }
+
+        # Pose bones by name, case-insensitive as a fallback
+        self._missing = []
+        if self.target == "ARMATURE":
+            self._armature = context.active_object
+            if self._armature is None or self._armature.type != "ARMATURE":
+                self.report({"ERROR"}, "Select an armature to receive the animation")
+                return {"CANCELLED"}
+            self._bone_map = {}
+            for pose_bone in self._armature.pose.bones:
+                self._bone_map.setdefault(pose_bone.name.lower(), pose_bone)
+                self._bone_map[pose_bone.name] = pose_bone
+
+        # Proxy objects come from the snapshot of an identical earlier import
+        use_cache = self.use_cache and self.target == "OBJECTS"
+        if use_cache:
+            objects = self.load_from_cache(context, data, self._options)
+            if objects is not None:
+                ranges = [
+                    obj.animation_data.action.frame_range
+                    for obj in objects
+                    if obj.animation_data and obj.animation_data.action
+                ]
+                if ranges:
+                    context.scene.frame_start = max(int(min(r[0] for r in ranges)), 1)
+                    context.scene.frame_end = int(max(r[1] for r in ranges)) + 1
+                self.report({"INFO"}, f"{file_name} animation loaded from cache")
+                return {"FINISHED"}
+
+        if self.background:
+            return self.start_background(
+                context, file_name, lambda reporter: self.plan_items(reporter, data, file_name)
+            )
+
+        # Build everything now
+        try:
+            count, items = self.plan_items(self, data, file_name)
+        except ValueError as e:
+            self.report({"ERROR"}, str(e))
+            return {"CANCELLED"}
+        objects = []
+        for item in items:
+            objects.extend(self.build_item(context, item))
+        if use_cache:
+            self.save_to_cache(objects)
+
+        if self._missing:
+            self.report({"WARNING"}, f"{len(self._missing)} groups have no matching bone")
         self.report({"INFO"}, f"{file_name} animation loaded")
         return {"FINISHED"}
 
-    # Parse and retrieve frame data
-    def parse_anim_file(self, data, file_name):
-        log.debug("Processing %s", file_name)
-
-        # All vertex group info
-        all_group = []
-        # End offset of current group
-        group_eoffset = 0
-        # First feature
-        first_feature = 0
-        # Current file size used as end position
-        file_size = len(data)
-        # Some files include their own name with unknown data following it.
-        # Find it and adjust the end offset accordingly.
-        possible_end_offset = data.find(file_name.encode("utf-8"), 0)
-        if possible_end_offset != -1:
-            # Jump before the name length
-            file_size = possible_end_offset - 4
-
-        # Find vertex groups
-        log.debug("Begin searching vertex groups")
-        while True:
-            # File analysis https://www.cnblogs.com/letleon/p/18511408
-            try:
-                # Vertex group name length
-                group_name_length = struct.unpack(
-                    "I", data[group_eoffset: group_eoffset + 4]
-                )[0]
-                # Check length limit
-                if group_name_length > 63:
-                    log.debug(
-                        "!Name length %s exceeds Blender limit of 63 %s", group_name_length
-                    )
-                    break
-                log.debug("Group name length: %s", group_name_length)
-
-                # Read group name
-                group_name = data[
-                             group_eoffset + 4: group_eoffset + 4 + group_name_length
-                             ].decode("utf-8")
-                # Validate name
-                if not is_valid_group_name(group_name):
-                    log.debug("!Invalid name: %s", group_name)
-                    break
-                log.debug("Group name: %s", group_name)
-
-                # Number of frames in group -> end offset
-                frames_number = struct.unpack(
-                    "I",
-                    data[
-                    group_eoffset
-                    + 4
-                    + group_name_length: group_eoffset
-                                         + 4
-                                         + group_name_length
-                                         + 4
-                    ],
-                )[0]
-                if frames_number == 0:
-                    log.debug("!Frame count is zero: %s", frames_number)
-                    break
-                log.debug("Frame count: %s", frames_number)
-
-                # Read 8-byte feature
-                this_feature = data[
-                               group_eoffset
-                               + 4
-                               + group_name_length: group_eoffset
-                                                    + 4
-                                                    + group_name_length
-                                                    + 8
-                               ]  # feature is 8 bytes
-                # Ensure it matches the first feature
-                if first_feature == 0:
-                    if this_feature == 0:
-                        log.debug("!Feature cannot be zero: %s", this_feature.hex())
-                        break
-                    first_feature = this_feature
-                elif this_feature != first_feature:
-                    log.debug("!Feature mismatch: %s", this_feature.hex())
-                    break
-                log.debug("Feature: %s", this_feature.hex())
-
-                # Calculate start offset of group data
-                this_group_soffset = group_eoffset + 4 + group_name_length + 8
-                log.debug("Group start offset: %s", this_group_soffset)
-
-                # Calculate end position of group data
-                group_eoffset = (
-                        frames_number * 0x1C + group_eoffset + 4 + group_name_length + 8
-                )
-                if group_eoffset > file_size:
-                    log.debug("!Group end offset out of range: %s", group_eoffset)
-                    break
-                log.debug("Group end offset: %s", group_eoffset)
-
-                # Append to all_group
-                log.debug("Adding to all_group")
-                # Add the current vertex group
-                all_group.append(
-                    {
-                        "name": group_name,
-                        "soffset": this_group_soffset,
-                        "eoffset": group_eoffset,
-                    }
-                )
-
-                # Exit normally
-                if group_eoffset == file_size:
-                    log.debug("!Reached end while searching")
-                    break
-            except NameError:
-                log.debug("!Data read error, stop searching")
-                break
-
-        log.debug("Finished finding %s vertex groups", len(all_group))
-
-        # Vertex group frame data
-        vertex_groups = {}
-        # Retrieve all vertex group frames
-        for now_group in all_group:
-            # Name
-            group_name = now_group["name"]
-            log.debug("Name: %s", group_name)
-
-            # Add to vertex_groups
-            if group_name not in vertex_groups:
-                vertex_groups[group_name] = []
-
-            # Current group start offset
-            soffset = now_group["soffset"]
-            # Current group end offset
-            eoffset = now_group["eoffset"]
-            # log.debug("soffset: %s eoffset: %s",soffset,eoffset)
-            # Read vertex group frame data
-            while soffset < eoffset:
-                # Ensure enough remaining data
-                if eoffset - soffset < 28:
-                    log.debug("!Data less than 28 bytes")
-                    # Break if insufficient
-                    break
-                # Read 28-byte block
-                frame_data = data[soffset: soffset + 28]
-                # Location
-                location = struct.unpack("3f", frame_data[0:12])
-                # Quaternion -> will later convert to Euler
-                rotation = struct.unpack("3f", frame_data[12:24])
-                # Add to vertex_groups
-                vertex_groups[group_name].append(
-                    {"location": location, "rotation": rotation}
-                )
-                # Advance to next frame
-                soffset += 28
-
-        log.debug("Finished reading %s vertex group frames", len(vertex_groups))
-        # Return vertex group frames
-        return vertex_groups
+    def retag_cached(self, objects):
+        super().retag_cached(objects)
+        for obj in objects:
+            action = obj.animation_data.action if obj.animation_data else None
+            if action is not None and "pmt_source" in action:
+                tag_action(action, self.filepath, self._options, action.get("pmt_group"))
+
+    def plan_items(self, reporter, data, file_name):
+        """Return (count, items) to build; does not touch bpy"""
+        # Decode, retime and reduce the requested frames of the requested groups
+        tracks, first_frame, last_frame, kept = reader.prepare_tracks(
+            data, file_name, self._options
+        )
+        if not tracks:
+            raise ValueError("No animation groups found in the requested range")
+        log.debug("Frames: %s - %s", first_frame, last_frame)
+
+        if kept is not None:
+            before, after = kept
+            reporter.report(
+                {"INFO"},
+                f"Kept {after} of {before} keys ({after / max(before, 1):.1%})",
+            )
+
+        # Frame range first, then one item per group
+        items = [{"kind": "frames", "name": file_name, "start": first_frame, "end": last_frame}]
+        items.extend(
+            {"kind": "group", "name": group_name, "data": track}
+            for group_name, track in tracks.items()
+        )
+        return len(items), items
+
+    def build_item(self, context, item):
+        """Build one planned item, returning the created objects"""
+        if item["kind"] == "frames":
+            # Set Blender scene frame range
+            bpy.context.scene.frame_start = max(item["start"], 1)
+            bpy.context.scene.frame_end = item["end"] + 1
+            if self.target == "ARMATURE":
+                # One action holds the channels of every bone
+                self._action = bpy.data.actions.new(name=item["name"])
+                tag_action(self._action, self.filepath, self._options)
+                self._armature.animation_data_create()
+                self._armature.animation_data.action = self._action
+            return []
+
+        if self.target == "ARMATURE":
+            self.build_bone_track(item)
+            return []
+
+        group_name = item["name"]
+
+        # Create a cube mesh
+        mesh = bpy.data.meshes.new(name=group_name)
+        # Create a cube object
+        obj = bpy.data.objects.new(name=group_name, object_data=mesh)
+        # Link to scene
+        context.collection.objects.link(obj)
+
+        # Make it active
+        bpy.context.view_layer.objects.active = obj
+        # Save current mode
+        current_mode = bpy.context.object.mode
+        # Ensure object mode
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+        # Add cube data
+        bm = bmesh.new()
+        # Size 0.1
+        bmesh.ops.create_cube(bm, size=0.1)
+        bm.to_mesh(mesh)
+        bm.free()
+
+        # Restore mode
+        bpy.ops.object.mode_set(mode=current_mode)
+        # Update mesh
+        mesh.update()
+
+        # Location and rotation (Euler) keyframes, filled in bulk
+        action = bpy.data.actions.new(name=group_name)
+        tag_action(action, self.filepath, self._options, group_name)
+        tag_object(obj, self.filepath)
+        obj.animation_data_create()
+        obj.animation_data.action = action
+        write_track(action, "", group_name, item["data"])
+
+        return [obj]
+
+    def build_bone_track(self, item):
+        """Key the pose bone named like a group"""
+        group_name = item["name"]
+        pose_bone = self._bone_map.get(group_name) or self._bone_map.get(group_name.lower())
+        if pose_bone is None:
+            log.debug("! No bone for group: %s", group_name)
+            self._missing.append(group_name)
+            return
+
+        # Tracks hold Euler rotations
+        pose_bone.rotation_mode = "XYZ"
+        prefix = f'pose.bones["{bpy.utils.escape_identifier(pose_bone.name)}"].'
+        write_track(self._action, prefix, pose_bone.name, item["data"])
+
+
+# Enum value of linear keyframe interpolation
+LINEAR_INTERPOLATION = 1
+
+
+def tag_action(action, file_path, options, group_name=None):
+    """Tag an action with its source and reader options so it can be rebuilt"""
+    action["pmt_source"] = file_path
+    action["pmt_options"] = json.dumps(options)
+    if group_name is not None:
+        # Proxy actions hold a single group
+        action["pmt_group"] = group_name
+
+
+def write_track(action, prefix, group_name, track):
+    """Fill the location and rotation F-Curves of one track in bulk"""
+    written = set()
+    for (prop, axis), (frames, values) in reader.track_channels(track).items():
+        write_channel(
+            action, prefix + prop, axis, group_name, frames, values, track.get("linear", False)
+        )
+        written.add((prefix + prop, axis))
+
+    # Drop channels of the group a reduced track no longer keys
+    stale = [
+        fcurve
+        for fcurve in action.fcurves
+        if fcurve.group is not None
+        and fcurve.group.name == group_name
+        and fcurve.data_path.startswith(prefix)
+        and (fcurve.data_path, fcurve.array_index) not in written
+    ]
+    for fcurve in stale:
+        action.fcurves.remove(fcurve)
+
+
+def write_channel(action, data_path, index, group_name, frames, values, linear=False):
+    """Create one F-Curve and set all of its keys with foreach_set"""
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group_name)
+    else:
+        fcurve.keyframe_points.clear()
+
+    keys = np.empty((len(frames), 2), dtype=np.float32)
+    keys[:, 0] = frames
+    keys[:, 1] = values
+    fcurve.keyframe_points.add(len(keys))
+    fcurve.keyframe_points.foreach_set("co", keys.ravel())
+    if linear:
+        # Reduced keys are only exact with linear interpolation
+        fcurve.keyframe_points.foreach_set(
+            "interpolation", np.full(len(keys), LINEAR_INTERPOLATION, dtype=np.int32)
+        )
+    # Recalculate handles
+    fcurve.update()
@@ -0,0 +1,362 @@
+# anim\reader.py
+"""Decode .anim files into NumPy track arrays (no bpy)."""
+
+import fnmatch
+import struct
+
+import numpy as np
+
+from .. import tools
+from ..log import log
+from .utils import is_valid_group_name
+
+# Bytes per frame record: location f32 x3, rotation f32 x3, 4 unknown bytes
+FRAME_SIZE = 0x1C
+
+
+def locate_groups(data, file_name):
+    """Find every group, returning dicts with name, frame count and data offsets"""
+    # All groups
+    all_group = []
+    # End offset of current group
+    group_eoffset = 0
+    # First feature
+    first_feature = 0
+    # Current file size used as end position
+    file_size = len(data)
+    # Some files include their own name with unknown data following it.
+    # Find it and adjust the end offset accordingly.
+    possible_end_offset = data.find(file_name.encode("utf-8"), 0)
+    if possible_end_offset != -1:
+        # Jump before the name length
+        file_size = possible_end_offset - 4
+
+    # Find groups
+    log.debug("Begin searching vertex groups")
+    while group_eoffset + 4 <= len(data):
+        # File analysis https://www.cnblogs.com/letleon/p/18511408
+        # Group name length
+        group_name_length = struct.unpack_from("<I", data, group_eoffset)[0]
+        # Check length limit
+        if group_name_length > 63:
+            log.debug("!Name length %s exceeds Blender limit of 63", group_name_length)
+            break
+
+        # Read group name
+        try:
+            group_name = data[
+                group_eoffset + 4: group_eoffset + 4 + group_name_length
+            ].decode("utf-8")
+        except UnicodeDecodeError:
+            log.debug("!Undecodable name at %s", group_eoffset)
+            break
+        # Validate name
+        if not is_valid_group_name(group_name):
+            log.debug("!Invalid name: %s", group_name)
+            break
+
+        # Number of frames in group -> end offset
+        feature_offset = group_eoffset + 4 + group_name_length
+        if feature_offset + 8 > len(data):
+            log.debug("!Truncated group header: %s", group_name)
+            break
+        frames_number = struct.unpack_from("<I", data, feature_offset)[0]
+        if frames_number == 0:
+            log.debug("!Frame count is zero: %s", frames_number)
+            break
+
+        # 8-byte feature must match the first group's
+        this_feature = data[feature_offset: feature_offset + 8]
+        if first_feature == 0:
+            first_feature = this_feature
+        elif this_feature != first_feature:
+            log.debug("!Feature mismatch: %s", this_feature.hex())
+            break
+
+        # Group data range
+        this_group_soffset = feature_offset + 8
+        group_eoffset = this_group_soffset + frames_number * FRAME_SIZE
+        if group_eoffset > file_size:
+            log.debug("!Group end offset out of range: %s", group_eoffset)
+            break
+
+        all_group.append(
+            {
+                "name": group_name,
+                "frames": frames_number,
+                "soffset": this_group_soffset,
+                "eoffset": group_eoffset,
+            }
+        )
+
+        # Exit normally
+        if group_eoffset == file_size:
+            log.debug("!Reached end while searching")
+            break
+
+    log.debug("Finished finding %s vertex groups", len(all_group))
+    return all_group
+
+
+def read_group(data, group, first=0, count=None, step=1):
+    """Decode location and rotation of count frames from first, each (count, 3) float32
+
+    Only the requested records are touched: the view starts at the first
+    frame and strides over step records at a time.
+    """
+    if count is None:
+        count = (group["frames"] - first + step - 1) // step
+    offset = group["soffset"] + first * FRAME_SIZE
+    stride = FRAME_SIZE * step
+    location = tools.strided_view(data, "<f4", count, stride, offset, 3)
+    rotation = tools.strided_view(data, "<f4", count, stride, offset + 12, 3)
+    return location.astype(np.float32), rotation.astype(np.float32)
+
+
+def match_group(name, patterns):
+    """Whether a group name passes comma-separated glob patterns"""
+    return not patterns or any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+
+def read_tracks(data, file_name, frame_start=0, frame_stop=None, frame_step=1, patterns=None):
+    """Decode groups, returning {name: {"frames", "location", "rotation"}} track arrays
+
+    Only frames in range(frame_start, frame_stop, frame_step) of groups whose
+    name matches one of patterns are decoded; frames keep their original
+    numbers. Groups that share a name are appended to each other, frame
+    after frame.
+    """
+    tracks = {}
+    # Frames of earlier groups with the same name
+    name_frames = {}
+    for group in locate_groups(data, file_name):
+        group_name = group["name"]
+        base = name_frames.get(group_name, 0)
+        name_frames[group_name] = base + group["frames"]
+        if not match_group(group_name, patterns):
+            continue
+
+        # Requested frames that fall inside this group
+        first = max(frame_start, base)
+        first += -(first - frame_start) % frame_step
+        last = base + group["frames"]
+        if frame_stop is not None:
+            last = min(last, frame_stop)
+        if first >= last:
+            continue
+
+        frames = np.arange(first, last, frame_step, dtype=np.float32)
+        location, rotation = read_group(data, group, first - base, len(frames), frame_step)
+        track = tracks.get(group_name)
+        if track is None:
+            tracks[group_name] = {"frames": frames, "location": location, "rotation": rotation}
+        else:
+            track["frames"] = np.concatenate((track["frames"], frames))
+            track["location"] = np.concatenate((track["location"], location))
+            track["rotation"] = np.concatenate((track["rotation"], rotation))
+
+    log.debug("Finished reading %s vertex group frames", len(tracks))
+    return tracks
+
+
+def euler_to_quaternion(euler):
+    """Convert (N, 3) XYZ Euler angles to (N, 4) wxyz quaternions"""
+    half = np.asarray(euler, dtype=np.float64) / 2
+    cx, cy, cz = np.cos(half).T
+    sx, sy, sz = np.sin(half).T
+    return np.stack(
+        (
+            cx * cy * cz + sx * sy * sz,
+            sx * cy * cz - cx * sy * sz,
+            cx * sy * cz + sx * cy * sz,
+            cx * cy * sz - sx * sy * cz,
+        ),
+        axis=1,
+    )
+
+
+def quaternion_to_euler(quaternion):
+    """Convert (N, 4) wxyz quaternions to (N, 3) XYZ Euler angles"""
+    w, x, y, z = np.asarray(quaternion, dtype=np.float64).T
+    return np.stack(
+        (
+            np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y)),
+            np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0)),
+            np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)),
+        ),
+        axis=1,
+    )
+
+
+def slerp(q0, q1, t):
+    """Spherical interpolation between (N, 4) quaternion pairs at (N,) factors"""
+    dot = (q0 * q1).sum(axis=1)
+    # Take the short way round
+    q1 = np.where(dot[:, None] < 0, -q1, q1)
+    dot = np.abs(dot)
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    # Nearly parallel pairs fall back to linear interpolation
+    close = sin_theta < 1e-6
+    safe = np.where(close, 1.0, sin_theta)
+    w0 = np.where(close, 1 - t, np.sin((1 - t) * theta) / safe)
+    w1 = np.where(close, t, np.sin(t * theta) / safe)
+    result = w0[:, None] * q0 + w1[:, None] * q1
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
+
+
+def resample_track(track, source_fps, target_fps):
+    """Resample a track from source_fps to whole frames at target_fps
+
+    Locations are interpolated linearly, rotations with slerp on
+    quaternions converted from and back to XYZ Euler angles.
+    """
+    frames = np.asarray(track["frames"], dtype=np.float64)
+    if len(frames) < 2 or source_fps == target_fps:
+        return track
+
+    # Source keys on the target time line, and the whole target frames they cover
+    times = frames * (target_fps / source_fps)
+    new_frames = np.arange(np.ceil(times[0]), np.floor(times[-1]) + 1)
+
+    # Source segment and blend factor of every target frame
+    segment = np.clip(np.searchsorted(times, new_frames, side="right") - 1, 0, len(times) - 2)
+    t = (new_frames - times[segment]) / (times[segment + 1] - times[segment])
+    t = np.clip(t, 0.0, 1.0)
+
+    location = track["location"].astype(np.float64)
+    location = location[segment] + t[:, None] * (location[segment + 1] - location[segment])
+
+    quaternions = euler_to_quaternion(track["rotation"])
+    rotation = quaternion_to_euler(slerp(quaternions[segment], quaternions[segment + 1], t))
+    # Keep Euler curves continuous across the +-pi wrap
+    rotation = np.unwrap(rotation, axis=0)
+
+    return dict(
+        track,
+        frames=new_frames.astype(np.float32),
+        location=location.astype(np.float32),
+        rotation=rotation.astype(np.float32),
+    )
+
+
+# Track arrays and the properties they key
+CHANNELS = (("location", "location"), ("rotation", "rotation_euler"))
+
+
+def track_channels(track):
+    """Return {(property, axis): (frames, values)} of a track"""
+    if "channels" in track:
+        return track["channels"]
+
+    channels = {}
+    for name, prop in CHANNELS:
+        values = track[name]
+        # One key per frame, starting at frame 0
+        frames = track.get("frames")
+        if frames is None:
+            frames = np.arange(len(values), dtype=np.float32)
+        for axis in range(values.shape[1]):
+            channels[(prop, axis)] = (frames, values[:, axis])
+    return channels
+
+
+def simplify_channel(frames, values, tolerance):
+    """Indices of the keys to keep so linear interpolation stays within tolerance
+
+    Douglas-Peucker: the worst key of a span is kept and both halves are
+    checked again, each span in one vectorized pass.
+    """
+    count = len(values)
+    if count <= 2:
+        return np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, count - 1)]
+    while spans:
+        start, end = spans.pop()
+        if end - start < 2:
+            continue
+        # Linear interpolation between the span ends
+        t = (frames[start + 1: end] - frames[start]) / (frames[end] - frames[start])
+        line = values[start] + t * (values[end] - values[start])
+        error = np.abs(values[start + 1: end] - line)
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = start + 1 + worst
+            keep[split] = True
+            spans.append((start, split))
+            spans.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def reduce_track(track, tolerance):
+    """Drop redundant keys of a track, returning (track, keys before, keys after)
+
+    Constant channels keep a single key, or none when they hold the rest
+    value 0; the rest keep only the keys linear interpolation cannot
+    reproduce within tolerance.
+    """
+    channels = {}
+    before = after = 0
+    for key, (frames, values) in track_channels(track).items():
+        before += len(values)
+        if not len(values):
+            continue
+        if np.all(np.abs(values - values[0]) <= tolerance):
+            # Static channel
+            if abs(values[0]) > tolerance:
+                channels[key] = (frames[:1], values[:1])
+                after += 1
+            continue
+        kept = simplify_channel(frames, values, tolerance)
+        channels[key] = (frames[kept], values[kept])
+        after += len(kept)
+
+    return {"channels": channels, "linear": True}, before, after
+
+
+def prepare_tracks(data, file_name, options):
+    """Decode tracks the way an import with the given options keys them
+
+    options holds frame_start, frame_stop, frame_step and patterns for
+    read_tracks, source_fps and target_fps (None to keep the timing) and
+    tolerance (None to keep every key). Returns (tracks, first frame, last
+    frame, (keys before, keys after) or None).
+    """
+    tracks = read_tracks(
+        data,
+        file_name,
+        options.get("frame_start", 0),
+        options.get("frame_stop"),
+        options.get("frame_step", 1),
+        options.get("patterns"),
+    )
+    if not tracks:
+        return tracks, 0, 0, None
+
+    if options.get("target_fps"):
+        # Retime all tracks before reducing or keying
+        for group_name, track in tracks.items():
+            tracks[group_name] = resample_track(
+                track, options["source_fps"], options["target_fps"]
+            )
+
+    # Keyed frame range, before reduction drops keys
+    first_frame = int(min(track["frames"][0] for track in tracks.values()))
+    last_frame = int(max(track["frames"][-1] for track in tracks.values()))
+
+    kept = None
+    if options.get("tolerance") is not None:
+        before = after = 0
+        for group_name, track in tracks.items():
+            tracks[group_name], track_before, track_after = reduce_track(
+                track, options["tolerance"]
+            )
+            before += track_before
+            after += track_after
+        kept = (before, after)
+    return tracks, first_frame, last_frame, kept
@@ -0,0 +1,137 @@
+# anim\sampler.py
+"""Sample decoded animation clips at arbitrary times (no bpy)."""
+
+import os
+
+import numpy as np
+
+from . import reader
+
+
+class AnimSampler:
+    """A clip loaded once into flat arrays, sampled at batches of (group, time) pairs"""
+
+    def __init__(self, tracks, fps=30.0):
+        self.names = list(tracks)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.fps = fps
+
+        # Keys of all groups back to back; offsets delimit every group
+        counts = [len(track["frames"]) for track in tracks.values()]
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        if self.names:
+            self.frames = np.concatenate([t["frames"] for t in tracks.values()]).astype(np.float64)
+            self.location = np.concatenate([t["location"] for t in tracks.values()]).astype(np.float64)
+            self.quaternions = reader.euler_to_quaternion(
+                np.concatenate([t["rotation"] for t in tracks.values()])
+            )
+        else:
+            self.frames = np.zeros(0)
+            self.location = np.zeros((0, 3))
+            self.quaternions = np.zeros((0, 4))
+
+        # One sorted search key for all groups: group * span + frame
+        self.span = float(self.frames.max()) + 2 if len(self.frames) else 1.0
+        group_ids = np.repeat(np.arange(len(counts)), counts)
+        self.keys = group_ids * self.span + self.frames
+
+    @classmethod
+    def from_file(cls, file_path, fps=30.0, **options):
+        """Decode a clip from disk; options are passed to reader.read_tracks"""
+        with open(file_path, "rb") as file:
+            data = file.read()
+        file_name = os.path.splitext(os.path.basename(file_path))[0]
+        return cls(reader.read_tracks(data, file_name, **options), fps)
+
+    @property
+    def duration(self):
+        """Length of the clip in seconds"""
+        return float(self.frames.max()) / self.fps if len(self.frames) else 0.0
+
+    def group_indices(self, groups):
+        """Group indices of names or indices"""
+        groups = np.atleast_1d(np.asarray(groups))
+        if groups.dtype.kind in "US":
+            return np.array([self.index[name] for name in groups], dtype=np.int64)
+        return groups.astype(np.int64)
+
+    def sample(self, groups, times):
+        """Sample (locations (N, 3), wxyz quaternions (N, 4)) of groups at times in seconds
+
+        groups and times broadcast against each other; times outside a group's
+        keys hold its first or last key.
+        """
+        groups, frames = np.broadcast_arrays(
+            self.group_indices(groups), np.asarray(times, dtype=np.float64) * self.fps
+        )
+        groups = groups.ravel()
+        first = self.offsets[groups]
+        last = self.offsets[groups + 1] - 1
+        frames = np.clip(frames.ravel(), self.frames[first], self.frames[last])
+
+        # Key at or before every query, and the key after it
+        before = np.searchsorted(self.keys, groups * self.span + frames, side="right") - 1
+        before = np.clip(before, first, np.maximum(last - 1, first))
+        after = np.minimum(before + 1, last)
+        gap = self.frames[after] - self.frames[before]
+        t = np.where(gap > 0, (frames - self.frames[before]) / np.where(gap > 0, gap, 1), 0.0)
+
+        location = self.location[before] + t[:, None] * (self.location[after] - self.location[before])
+        quaternion = reader.slerp(self.quaternions[before], self.quaternions[after], t)
+        return location, quaternion
+
+    def sample_euler(self, groups, times):
+        """Sample (locations (N, 3), XYZ Euler rotations (N, 3)) of groups at times in seconds"""
+        location, quaternion = self.sample(groups, times)
+        return location, reader.quaternion_to_euler(quaternion)
+
+
+def compose(location, quaternion):
+    """(N, 4, 4) matrices from (N, 3) translations and (N, 4) wxyz rotations"""
+    w, x, y, z = np.asarray(quaternion, dtype=np.float64).T
+    matrices = np.zeros((len(w), 4, 4))
+    matrices[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[:, 0, 1] = 2 * (x * y - w * z)
+    matrices[:, 0, 2] = 2 * (x * z + w * y)
+    matrices[:, 1, 0] = 2 * (x * y + w * z)
+    matrices[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[:, 1, 2] = 2 * (y * z - w * x)
+    matrices[:, 2, 0] = 2 * (x * z - w * y)
+    matrices[:, 2, 1] = 2 * (y * z + w * x)
+    matrices[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    matrices[:, :3, 3] = location
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def world_transforms(skeleton, sampler, time):
+    """World matrices (bones, 4, 4) of every bone of a skeleton at time in seconds
+
+    Animated bones take their sampled track as transform relative to the
+    parent; others keep their rest offset from the parent head. Parents are
+    resolved one hierarchy level at a time, each level in one batched product.
+    """
+    names = skeleton["names"]
+    parents = skeleton["parents"]
+    levels = skeleton["levels"]
+    heads = skeleton["heads"].astype(np.float64)
+
+    # Rest pose: offset from the parent head, no rotation
+    location = heads.copy()
+    has_parent = parents >= 0
+    location[has_parent] -= heads[parents[has_parent]]
+    quaternion = np.tile([1.0, 0.0, 0.0, 0.0], (len(names), 1))
+
+    # Sampled transforms of the animated bones
+    animated = np.array([i for i, name in enumerate(names) if name in sampler.index], dtype=np.int64)
+    if len(animated):
+        groups = [names[i] for i in animated]
+        location[animated], quaternion[animated] = sampler.sample(groups, time)
+
+    local = compose(location, quaternion)
+    world = local.copy()
+    for level in np.unique(levels):
+        bones = np.flatnonzero((levels == level) & has_parent)
+        if len(bones):
+            world[bones] = world[parents[bones]] @ local[bones]
+    return world
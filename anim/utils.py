@@ -2,13 +2,15 @@
 """Utility helpers for animation import."""
 
 import re
-from mathutils import Quaternion
 
 from ..log import log
 
 
 def quat_to_eul(quat):
     """Convert a quaternion to Euler angles in XYZ order."""
+    # Imported here so the track reader stays usable without Blender
+    from mathutils import Quaternion
+
     quat_obj = Quaternion(quat)
     euler_obj = quat_obj.to_euler("XYZ")
     return euler_obj
@@ -0,0 +1,205 @@
+# background.py
+import queue
+import threading
+import traceback
+
+import bpy
+
+from .builder import report_sanitation
+from .log import log
+
+
+class ThreadReporter:
+    """Collect operator reports made on a worker thread"""
+
+    def __init__(self):
+        self.reports = []
+
+    def report(self, report_type, message):
+        self.reports.append((report_type, message))
+
+    def replay(self, operator):
+        """Report the collected messages through an operator"""
+        for report_type, message in self.reports:
+            operator.report(report_type, message)
+        self.reports = []
+
+
+def iter_pipeline(produce, maxsize=4):
+    """Run produce() on a worker thread, yielding its items through a bounded queue
+
+    The worker decodes item k + 1 while the caller builds item k; NumPy and
+    file reads release the GIL, so both stages make progress. Exceptions of
+    the producer are raised again in the caller.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(entry):
+        # Give up when the consumer has stopped listening
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def work():
+        try:
+            for item in produce():
+                if not put(("item", item)):
+                    return
+        except Exception as e:
+            traceback.print_exc()
+            put(("error", e))
+            return
+        put(("done", None))
+
+    threading.Thread(target=work, daemon=True).start()
+    try:
+        while True:
+            kind, payload = items.get()
+            if kind == "error":
+                raise payload
+            if kind == "done":
+                return
+            yield payload
+    finally:
+        stop.set()
+
+
+class BackgroundImportMixin:
+    """Parse on a worker thread and build a bounded number of items per timer tick
+
+    Operators implement build_item(context, item) returning the objects it
+    created, and call start_background with a plan callable. The plan runs on
+    the worker thread, receives a ThreadReporter and returns (count, items);
+    it must not touch bpy or operator properties.
+    """
+
+    # Items built per timer tick
+    items_per_tick = 4
+    # Timer interval in seconds
+    tick_interval = 0.02
+
+    def start_background(self, context, title, plan):
+        """Start the worker and the modal timer"""
+        wm = context.window_manager
+        self._title = title
+        self._queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._reporter = ThreadReporter()
+        self._created = []
+        self._done = 0
+        self._total = 0
+
+        self._thread = threading.Thread(target=self._work, args=(plan,), daemon=True)
+        self._thread.start()
+
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(self.tick_interval, window=context.window)
+        wm.modal_handler_add(self)
+        log.debug(">>> Background import started: %s", title)
+        return {"RUNNING_MODAL"}
+
+    def _work(self, plan):
+        """Worker thread: run the plan and queue finished items"""
+        try:
+            self._total, items = plan(self._reporter)
+            for item in items:
+                if self._cancel_event.is_set():
+                    return
+                self._queue.put(("item", item))
+        except Exception as e:
+            log.debug("! Background parse failed: %s", e)
+            traceback.print_exc()
+            self._queue.put(("error", e))
+            return
+        self._queue.put(("done", None))
+
+    def build_pipelined(self, context, plan, maxsize=4):
+        """Build a plan's items while a worker thread decodes the next ones
+
+        Returns the created objects.
+        """
+        reporter = ThreadReporter()
+        created = []
+        built = 0
+        try:
+            for item in iter_pipeline(lambda: plan(reporter)[1], maxsize):
+                created.extend(self.build_item(context, item))
+                built += 1
+        finally:
+            reporter.replay(self)
+            report_sanitation(self)
+        log.debug("<<< Built %s items", built)
+        return created
+
+    def modal(self, context, event):
+        if event.type == "ESC":
+            self.report({"WARNING"}, f"{self._title} import cancelled")
+            return self.stop_background(context, rollback=True)
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        # Build a bounded number of finished items
+        for _ in range(self.items_per_tick):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "error":
+                self.report({"ERROR"}, f"Failed to load {self._title}: {payload}")
+                return self.stop_background(context, rollback=True)
+            if kind == "done":
+                self.report({"INFO"}, f"{self._title} loaded: {self._done} items")
+                return self.stop_background(context, rollback=False)
+            self._created.extend(self.build_item(context, payload))
+            self._done += 1
+
+        # Progress in the cursor and the status bar
+        if self._total:
+            context.window_manager.progress_update(min(100, self._done * 100 // self._total))
+        context.workspace.status_text_set(
+            f"Importing {self._title}: {self._done}/{self._total or '?'} (Esc to cancel)"
+        )
+        return {"RUNNING_MODAL"}
+
+    def cancel(self, context):
+        # Blender cancelled the modal operator (e.g. the window closed)
+        self.stop_background(context, rollback=True)
+
+    def stop_background(self, context, rollback):
+        """Stop the worker and the timer, optionally removing what was built"""
+        self._cancel_event.set()
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+        # Replay reports made on the worker thread
+        self._reporter.replay(self)
+        report_sanitation(self)
+
+        if rollback:
+            self.rollback()
+            return {"CANCELLED"}
+        return {"FINISHED"}
+
+    def rollback(self):
+        """Remove the objects built so far and data only they used"""
+        objects = [obj for obj in self._created if obj is not None]
+        data = set()
+        for obj in objects:
+            if obj.data is not None:
+                data.add(obj.data)
+            if obj.animation_data is not None and obj.animation_data.action is not None:
+                data.add(obj.animation_data.action)
+
+        bpy.data.batch_remove(objects)
+        bpy.data.batch_remove([block for block in data if block.users == 0])
+        log.debug("<<< Rolled back %s objects", len(objects))
+        self._created = []
@@ -0,0 +1,58 @@
+# batch\operator.py
+import os
+
+import bpy
+
+from . import utils
+
+
+class ConvertBatchClass(bpy.types.Operator):
+    """Convert an asset folder, redoing only files that changed since the last run"""
+
+    bl_idname = "import.pmt_batch_convert"
+    bl_label = "Batch Convert Folder"
+    bl_options = {"REGISTER"}
+
+    # Source folder
+    directory: bpy.props.StringProperty(subtype="DIR_PATH", default="")  # type: ignore
+    # Output folder holding the manifest
+    output_directory: bpy.props.StringProperty(
+        name="Output Folder",
+        description="Folder receiving the converted files and the manifest",
+        subtype="DIR_PATH",
+        default="",
+    )  # type: ignore
+    # Worker threads
+    workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Threads converting files (0 for one per CPU)",
+        default=0,
+        min=0,
+    )  # type: ignore
+    # Ignore the manifest
+    force: bpy.props.BoolProperty(
+        name="Full Rebuild",
+        description="Convert every file, even when the manifest says it is up to date",
+        default=False,
+    )  # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        if not os.path.isdir(self.directory):
+            self.report({"ERROR"}, "Source folder does not exist")
+            return {"CANCELLED"}
+        if not self.output_directory:
+            self.report({"ERROR"}, "Choose an output folder")
+            return {"CANCELLED"}
+
+        converted, skipped, pruned, failed = utils.rebuild(
+            self.directory, bpy.path.abspath(self.output_directory), self.workers, self.force
+        )
+        self.report(
+            {"WARNING"} if failed else {"INFO"},
+            f"Converted {converted}, unchanged {skipped}, pruned {pruned}, failed {failed}",
+        )
+        return {"FINISHED"}
@@ -0,0 +1,190 @@
+# batch\utils.py
+"""Manifest-driven batch conversion of asset trees (no bpy)."""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..anim import reader as anim_reader
+from ..catalog import utils as catalog_utils
+from ..log import log
+from ..skel import reader as skel_reader
+
+# Manifest file kept in the output folder
+MANIFEST_NAME = "pmt_manifest.json"
+# Bump when a parser or writer changes its output
+PARSER_VERSIONS = {"wcm": 2, "prop": 2, "map": 2, "anim": 2, "skel": 2}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(out_root):
+    """Manifest of an output folder, empty when there is none"""
+    path = os.path.join(out_root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_manifest(out_root, manifest):
+    """Write a manifest atomically"""
+    path = os.path.join(out_root, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def write_obj(path, submeshes):
+    """Write decoded submeshes as objects of one OBJ file"""
+    with open(path, "w", encoding="utf-8") as file:
+        offset = 1
+        for index, submesh in enumerate(submeshes):
+            file.write(f"o {submesh.name or index}\n")
+            np.savetxt(file, submesh.vertices, fmt="v %.6f %.6f %.6f")
+            np.savetxt(file, submesh.uvs, fmt="vt %.6f %.6f")
+            np.savetxt(file, submesh.normals, fmt="vn %.6f %.6f %.6f")
+            # Positions, UVs and normals share indices
+            corners = submesh.faces[:, [0, 0, 0, 1, 1, 1, 2, 2, 2]].astype(np.int64) + offset
+            np.savetxt(file, corners, fmt="f %d/%d/%d %d/%d/%d %d/%d/%d")
+            offset += len(submesh.vertices)
+
+
+def convert_file(path, out_base):
+    """Convert one asset next to out_base, returning (kind, output paths)
+
+    out_base keeps the source extension (foo.anim -> foo.anim.npz) so that
+    assets differing only in extension do not overwrite each other.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    kind = catalog_utils.detect_kind(path, data)
+
+    if kind == "anim":
+        file_name = os.path.splitext(os.path.basename(path))[0]
+        tracks = anim_reader.read_tracks(data, file_name)
+        output = out_base + ".npz"
+        arrays = {}
+        for group_name, track in tracks.items():
+            for key, values in track.items():
+                arrays[f"{group_name}/{key}"] = values
+        np.savez_compressed(output, **arrays)
+        return kind, [output]
+
+    if kind == "skel":
+        skeleton = skel_reader.read_skeleton(data)
+        output = out_base + ".npz"
+        np.savez_compressed(output, **dict(skeleton, names=np.array(skeleton["names"])))
+        return kind, [output]
+
+    submeshes = catalog_utils.decode_submeshes(kind, data)
+    output = out_base + ".obj"
+    write_obj(output, submeshes)
+    return kind, [output]
+
+
+def rebuild(src_root, out_root, workers=0, force=False):
+    """Convert new and changed assets, prune outputs of deleted ones
+
+    A file is converted again when its content hash or the version of its
+    parser differs from the manifest. Unchanged mtime and size reuse the
+    recorded hash instead of reading the file. Returns (converted, skipped,
+    pruned, failed) counts.
+    """
+    src_root = os.path.abspath(src_root)
+    out_root = os.path.abspath(out_root)
+    os.makedirs(out_root, exist_ok=True)
+    manifest = load_manifest(out_root)
+    records = manifest.setdefault("files", {})
+
+    # Inputs relative to the source folder
+    inputs = {}
+    for directory, _, file_names in os.walk(src_root):
+        for file_name in file_names:
+            if file_name.lower().endswith(catalog_utils.SCAN_EXTENSIONS):
+                path = os.path.join(directory, file_name)
+                inputs[os.path.relpath(path, src_root)] = path
+
+    def check(relative):
+        """Return (relative, hash, stamp) of an input that needs converting, else None"""
+        stat = os.stat(inputs[relative])
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        record = records.get(relative)
+        if record is not None and not force and record.get("stamp") == stamp:
+            content = record["hash"]
+        else:
+            content = file_hash(inputs[relative])
+        if (
+            not force
+            and record is not None
+            and record["hash"] == content
+            and record["parser"] == PARSER_VERSIONS.get(record["kind"])
+            and all(os.path.exists(os.path.join(out_root, o)) for o in record["outputs"])
+        ):
+            # Unchanged; refresh the stamp only
+            record["stamp"] = stamp
+            return None
+        return relative, content, stamp
+
+    def convert(job):
+        """Convert one input, returning (relative, record or error)"""
+        relative, content, stamp = job
+        out_base = os.path.join(out_root, relative)
+        os.makedirs(os.path.dirname(out_base), exist_ok=True)
+        try:
+            kind, outputs = convert_file(inputs[relative], out_base)
+        except Exception as e:
+            log.debug("! Failed to convert %s: %s", relative, e)
+            return relative, e
+        return relative, {
+            "kind": kind,
+            "hash": content,
+            "stamp": stamp,
+            "parser": PARSER_VERSIONS[kind],
+            "outputs": [os.path.relpath(o, out_root) for o in outputs],
+        }
+
+    converted = failed = pruned = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        jobs = [job for job in pool.map(check, sorted(inputs)) if job is not None]
+        for relative, result in pool.map(convert, jobs):
+            if isinstance(result, Exception):
+                failed += 1
+                continue
+            # Drop outputs the new conversion no longer writes
+            old = records.get(relative)
+            for output in set(old["outputs"] if old else ()) - set(result["outputs"]):
+                remove_output(out_root, output)
+            records[relative] = result
+            converted += 1
+
+    # Prune outputs of deleted inputs
+    for relative in [r for r in records if r not in inputs]:
+        for output in records.pop(relative)["outputs"]:
+            remove_output(out_root, output)
+        pruned += 1
+
+    save_manifest(out_root, manifest)
+    skipped = len(inputs) - len(jobs)
+    log.debug(
+        "<<< Rebuild: %s converted, %s unchanged, %s pruned, %s failed",
+        converted, skipped, pruned, failed,
+    )
+    return converted, skipped, pruned, failed
+
+
+def remove_output(out_root, output):
+    """Delete one output file if it is still there"""
+    path = os.path.join(out_root, output)
+    if os.path.exists(path):
+        os.remove(path)
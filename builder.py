@@ -0,0 +1,267 @@
+# builder.py
+import math
+from collections import Counter
+
+import bpy
+import numpy as np
+
+from . import tools
+from .log import log
+
+# Meshes built this session, content hash -> mesh name
+_mesh_cache = {}
+# Fixes made by the sanitation pass since they were last reported
+_sanitation = Counter()
+
+
+def find_cached_mesh(content_hash):
+    """Return a mesh built earlier from identical data, if it still exists"""
+    mesh = bpy.data.meshes.get(_mesh_cache.get(content_hash, ""))
+    if mesh is not None and mesh.get("pmt_hash") == content_hash:
+        return mesh
+    _mesh_cache.pop(content_hash, None)
+    return None
+
+
+def sanitize(this_obj):
+    """Sanitized copy of a SubMesh, counting what was fixed"""
+    this_obj, counts = tools.sanitize_submesh(this_obj)
+    if counts:
+        log.debug("! Sanitized %s: %s", this_obj, counts)
+        _sanitation.update(counts)
+    return this_obj
+
+
+def take_sanitation():
+    """Return and reset the fixes counted since the last call"""
+    counts = dict(_sanitation)
+    _sanitation.clear()
+    return counts
+
+
+def report_sanitation(operator):
+    """Report the fixes made while an operator ran, if any"""
+    counts = take_sanitation()
+    if counts:
+        summary = ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+        operator.report({"WARNING"}, f"Fixed bad mesh data: {summary}")
+
+
+def build_mesh(name, this_obj):
+    """Create a mesh datablock from a decoded SubMesh"""
+    # Bad indices would crash Blender's mesh code
+    this_obj = sanitize(this_obj)
+    # Create new mesh
+    new_mesh = bpy.data.meshes.new(name)
+
+    # Create vertices and faces from the flat arrays
+    new_mesh.vertices.add(len(this_obj.vertices))
+    new_mesh.vertices.foreach_set("co", this_obj.vertices.ravel())
+    face_count = len(this_obj.faces)
+    new_mesh.loops.add(face_count * 3)
+    loop_vertices = this_obj.faces.ravel().astype(np.int32)
+    new_mesh.loops.foreach_set("vertex_index", loop_vertices)
+    new_mesh.polygons.add(face_count)
+    # Face sizes follow from loop_start (loop_total is read-only since 4.0)
+    new_mesh.polygons.foreach_set("loop_start", np.arange(0, face_count * 3, 3, dtype=np.int32))
+    # Edges are not set above, so let Blender derive them
+    new_mesh.update(calc_edges=True)
+
+    # Create UV layer
+    uv_layer = new_mesh.uv_layers.new(name="UVMap")
+
+    if this_obj.loop_uvs is not None:
+        # Welded meshes carry UVs and normals per face corner (= loop order)
+        uv_layer.data.foreach_set("uv", this_obj.loop_uvs.ravel())
+        new_mesh.shade_smooth()
+        new_mesh.normals_split_custom_set(this_obj.loop_normals)
+    else:
+        # Set UV for each loop
+        uv_layer.data.foreach_set("uv", this_obj.uvs[loop_vertices].ravel())
+
+        # Enable smooth shading
+        new_mesh.shade_smooth()
+
+        # Set custom normals
+        new_mesh.normals_split_custom_set_from_vertices(this_obj.normals)
+
+    # Keep the source object of every vertex of merged meshes
+    if this_obj.submesh_ids is not None:
+        attribute = new_mesh.attributes.new("submesh_id", "INT", "POINT")
+        attribute.data.foreach_set("value", this_obj.submesh_ids)
+
+    # Material slot of every face of merged meshes
+    if this_obj.face_materials is not None:
+        new_mesh.polygons.foreach_set("material_index", this_obj.face_materials)
+
+    # Update mesh
+    new_mesh.update()
+
+    return new_mesh
+
+
+def weld_object(this_obj, distance):
+    """Weld coincident vertices, moving UVs and normals to face corners"""
+    this_obj = sanitize(this_obj)
+    vertices, faces, corner_faces, kept = tools.weld_vertices(
+        this_obj.vertices, this_obj.faces, distance
+    )
+    log.debug("> Welded %s vertices into %s", len(this_obj.vertices), len(vertices))
+
+    welded = this_obj.replace(
+        vertices=vertices,
+        faces=faces,
+        loop_uvs=this_obj.uvs[corner_faces].reshape(-1, 2),
+        loop_normals=this_obj.normals[corner_faces].reshape(-1, 3),
+    )
+    if this_obj.face_materials is not None:
+        welded.face_materials = np.asarray(this_obj.face_materials)[kept]
+    if this_obj.submesh_ids is not None:
+        # A welded vertex takes the id of one of its face corners
+        ids = np.asarray(this_obj.submesh_ids)
+        welded.submesh_ids = np.zeros(len(vertices), dtype=np.int32)
+        welded.submesh_ids[faces.ravel()] = ids[corner_faces.ravel()]
+    if this_obj.bone_indices is not None:
+        # Welded vertices are coincident, so any corner's skin will do
+        welded.bone_indices = np.zeros((len(vertices), 4), dtype=np.int32)
+        welded.bone_weights = np.zeros((len(vertices), 4), dtype=np.float32)
+        welded.bone_indices[faces.ravel()] = this_obj.bone_indices[corner_faces.ravel()]
+        welded.bone_weights[faces.ravel()] = this_obj.bone_weights[corner_faces.ravel()]
+    return welded
+
+
+def bone_name(this_obj, bone):
+    """Name of a bone index, falling back to a numbered name"""
+    names = this_obj.bone_names or ()
+    return names[bone] if bone < len(names) else f"bone_{bone}"
+
+
+def apply_skin(obj, this_obj, write_weights=True):
+    """Create vertex groups from decoded bone indices and weights"""
+    # One group per bone of the name table, in table order
+    bones = np.unique(this_obj.bone_indices)
+    bones = bones[bones != tools.UNUSED_BONE]
+    count = max(len(this_obj.bone_names or ()), int(bones.max()) + 1 if len(bones) else 0)
+    groups = [
+        obj.vertex_groups.get(bone_name(this_obj, bone))
+        or obj.vertex_groups.new(name=bone_name(this_obj, bone))
+        for bone in range(count)
+    ]
+    if not write_weights:
+        # Weights live on the (shared) mesh already
+        return
+
+    # One add() call per (bone, weight) run instead of per vertex
+    runs = tools.group_skin(this_obj.bone_indices, this_obj.bone_weights)
+    for bone, weight, vertex_ids in runs:
+        groups[bone].add(vertex_ids.tolist(), weight, "REPLACE")
+    log.debug("> Wrote %s vertex group runs to %s", len(runs), obj.name)
+
+
+def mesh_key(this_obj, weld_distance=0.0):
+    """Cache key of the mesh built from a SubMesh"""
+    if this_obj.hash and weld_distance > 0:
+        # Welded and unwelded meshes of the same data differ
+        return f"{this_obj.hash}-w{weld_distance:g}"
+    return this_obj.hash
+
+
+def split_key(key):
+    """Content hash and weld distance of a mesh cache key"""
+    content_hash, _, weld = (key or "").partition("-w")
+    return content_hash, float(weld) if weld else 0.0
+
+
+def same_topology(mesh, this_obj):
+    """Whether a mesh has the vertices and face corners of a SubMesh"""
+    if len(mesh.vertices) != len(this_obj.vertices) or len(mesh.polygons) != len(this_obj.faces):
+        return False
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    return np.array_equal(loop_vertices, this_obj.faces.ravel())
+
+
+def update_mesh(mesh, this_obj):
+    """Overwrite positions, UVs and normals of a mesh in place
+
+    Returns False without touching the mesh when its topology differs.
+    """
+    if this_obj.loop_uvs is not None:
+        return False
+    # Compare with the faces build_mesh would have kept
+    this_obj = sanitize(this_obj)
+    if not same_topology(mesh, this_obj):
+        return False
+
+    mesh.vertices.foreach_set("co", this_obj.vertices.ravel())
+    uv_layer = mesh.uv_layers.get("UVMap") or mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set("uv", this_obj.uvs[this_obj.faces.ravel()].ravel())
+    mesh.normals_split_custom_set_from_vertices(this_obj.normals)
+    mesh.update()
+
+    key = mesh_key(this_obj)
+    mesh["pmt_hash"] = key
+    _mesh_cache[key] = mesh.name
+    return True
+
+
+def replace_mesh(obj, this_obj, weld_distance=0.0):
+    """Give an object a newly built mesh with the old materials, returning the old mesh"""
+    old_mesh = obj.data
+    key = mesh_key(this_obj, weld_distance)
+    if weld_distance > 0:
+        this_obj = weld_object(this_obj, weld_distance)
+    new_mesh = build_mesh(old_mesh.name, this_obj)
+    new_mesh["pmt_hash"] = key
+    _mesh_cache[key] = new_mesh.name
+    for material in old_mesh.materials:
+        new_mesh.materials.append(material)
+
+    # Modifiers, vertex groups and transforms stay on the object
+    obj.data = new_mesh
+    if this_obj.bone_indices is not None and len(obj.vertex_groups):
+        apply_skin(obj, this_obj)
+    return old_mesh
+
+
+def build_mesh_object(context, name, this_obj, instance=True, weld_distance=0.0, skin=True):
+    """Create and link a mesh object, sharing the mesh of identical data"""
+    content_hash = mesh_key(this_obj, weld_distance)
+
+    # Reuse the mesh of byte-identical data
+    new_mesh = find_cached_mesh(content_hash) if instance and content_hash else None
+    instanced = new_mesh is not None
+    if instanced:
+        log.debug("> Instancing mesh %s for %s", new_mesh.name, name)
+    else:
+        if weld_distance > 0:
+            this_obj = weld_object(this_obj, weld_distance)
+        new_mesh = build_mesh(name, this_obj)
+        if content_hash:
+            new_mesh["pmt_hash"] = content_hash
+            _mesh_cache[content_hash] = new_mesh.name
+
+    new_obj = bpy.data.objects.new(name, new_mesh)
+
+    # Link object to scene
+    context.collection.objects.link(new_obj)
+
+    # Vertex groups from the decoded skin
+    if skin and this_obj.bone_indices is not None:
+        apply_skin(new_obj, this_obj, write_weights=not instanced)
+
+    # Set object location
+    new_obj.location = (0, 0, 0)
+    # Use Euler rotation mode
+    new_obj.rotation_mode = "XYZ"
+    # Rotate X by 90 degrees (radians)
+    new_obj.rotation_euler = (math.radians(90), 0, 0)
+
+    return new_obj
+
+
+def tag_object(obj, file_path, index=None):
+    """Tag an object with its source so it can be found again"""
+    obj["pmt_source"] = file_path
+    if index is not None:
+        obj["pmt_submesh"] = index
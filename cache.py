@@ -0,0 +1,133 @@
+# cache.py
+import hashlib
+import json
+import os
+import tomllib
+
+import bpy
+
+from .builder import tag_object
+from .log import log
+
+
+def read_addon_version():
+    """Version from the extension manifest, part of every cache key"""
+    path = os.path.join(os.path.dirname(__file__), "blender_manifest.toml")
+    try:
+        with open(path, "rb") as file:
+            return tomllib.load(file)["version"]
+    except (OSError, KeyError, tomllib.TOMLDecodeError):
+        return "0"
+
+
+ADDON_VERSION = read_addon_version()
+
+
+def cache_dir():
+    """Folder holding the .blend snapshots"""
+    path = os.path.join(bpy.utils.user_resource("CONFIG", create=True), "pmt_cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_key(data, idname, options):
+    """Key of an import: file content, add-on version, operator and its options"""
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(
+        json.dumps([ADDON_VERSION, idname, options], sort_keys=True, default=repr).encode()
+    )
+    return digest.hexdigest()
+
+
+class CachedImportMixin:
+    """Save built imports as .blend snapshots and load them again instead of parsing
+
+    Operators call load_from_cache before parsing and save_to_cache with the
+    created objects; background imports are saved when they finish. List it
+    before BackgroundImportMixin.
+
+    Appended objects are retagged with the file being imported. Linked
+    objects are read-only library data and keep the source tags of the import
+    that wrote the snapshot, so reimports and the folder watcher do not touch
+    them.
+    """
+
+    # Use the snapshot cache
+    use_cache: bpy.props.BoolProperty(
+        name="Use Cache",
+        description="Load a snapshot of an earlier import of the same file and settings, "
+        "or save one after importing",
+        default=False,
+    )  # type: ignore
+    # Link instead of append
+    link_cached: bpy.props.BoolProperty(
+        name="Link From Cache",
+        description="Link cached objects instead of appending them (read-only, smaller files). "
+        "Linked objects keep the source path of the import that wrote the snapshot",
+        default=False,
+    )  # type: ignore
+
+    # Properties that do not change what an import builds; the dialog's
+    # listed_path only says which file its object list was read from
+    cache_ignored = {
+        "filepath", "filter_glob", "listed_path", "background", "use_cache", "link_cached"
+    }
+
+    def cache_options(self):
+        """Operator settings that change the built result"""
+        options = {}
+        for prop in self.bl_rna.properties:
+            if prop.identifier in self.cache_ignored or prop.type not in {
+                "BOOLEAN", "INT", "FLOAT", "STRING", "ENUM"
+            }:
+                continue
+            value = getattr(self, prop.identifier)
+            if isinstance(value, set):
+                # Enum flags
+                value = sorted(value)
+            elif not isinstance(value, str) and hasattr(value, "__len__"):
+                # Vector properties
+                value = list(value)
+            options[prop.identifier] = value
+        return options
+
+    def load_from_cache(self, context, data, extra=None):
+        """Load the snapshot of this import into the scene, returning its objects or None"""
+        key = cache_key(data, self.bl_idname, [self.cache_options(), extra])
+        self._cache_file = os.path.join(cache_dir(), key + ".blend")
+        if not os.path.exists(self._cache_file):
+            log.debug("> No cache snapshot %s", key)
+            return None
+
+        with bpy.data.libraries.load(self._cache_file, link=self.link_cached) as (data_from, data_to):
+            data_to.objects = list(data_from.objects)
+        objects = [obj for obj in data_to.objects if obj is not None]
+        for obj in objects:
+            context.collection.objects.link(obj)
+        if not self.link_cached:
+            # The snapshot may come from the same content at another path
+            self.retag_cached(objects)
+        log.debug("<<< Loaded %s objects from cache %s", len(objects), key)
+        return objects
+
+    def retag_cached(self, objects):
+        """Point the source tags of appended snapshot objects at this import's file"""
+        for obj in objects:
+            if "pmt_source" in obj:
+                tag_object(obj, self.filepath, obj.get("pmt_submesh"))
+
+    def save_to_cache(self, objects):
+        """Write the objects of this import and the data they use to its snapshot"""
+        objects = {obj for obj in objects if obj is not None}
+        if not objects or not getattr(self, "_cache_file", None):
+            return
+        # Write next to the target, then swap, so readers never see half a file
+        temp_path = self._cache_file + ".tmp"
+        bpy.data.libraries.write(temp_path, objects, path_remap="ABSOLUTE", compress=True)
+        os.replace(temp_path, self._cache_file)
+        log.debug("<<< Cached %s objects in %s", len(objects), self._cache_file)
+
+    def stop_background(self, context, rollback):
+        if not rollback and self.use_cache:
+            self.save_to_cache(self._created)
+        return super().stop_background(context, rollback)
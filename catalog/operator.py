@@ -0,0 +1,141 @@
+# catalog\operator.py
+import os
+
+import bpy
+
+from . import utils
+from ..log import log
+
+# Import operator of every catalog kind
+IMPORT_OPERATORS = {
+    "prop": "mesh_prop",
+    "map": "mesh_map",
+    "wcm": "wcm_mesh",
+    "anim": "anim",
+    "skel": "skel",
+}
+
+
+def catalog_path(settings):
+    """Database file of the catalog settings"""
+    if settings.database:
+        return bpy.path.abspath(settings.database)
+    return os.path.join(bpy.utils.user_resource("CONFIG", create=True), "pmt_catalog.sqlite")
+
+
+# Search result entry
+class CatalogResultItem(bpy.types.PropertyGroup):
+    """File found in the catalog"""
+
+    # File path is stored in name
+    kind: bpy.props.StringProperty()  # type: ignore
+    detail: bpy.props.StringProperty()  # type: ignore
+
+
+# Catalog settings stored on the scene
+class CatalogSettings(bpy.types.PropertyGroup):
+    """Asset catalog location, search and results"""
+
+    database: bpy.props.StringProperty(
+        name="Catalog",
+        description="SQLite catalog file (empty for one in the Blender config folder)",
+        subtype="FILE_PATH",
+        default="",
+    )  # type: ignore
+    search_text: bpy.props.StringProperty(
+        name="Search",
+        description="Text to find in file paths, object, bone and group names",
+        default="",
+    )  # type: ignore
+    search_kind: bpy.props.EnumProperty(
+        name="Kind",
+        items=(
+            ("ALL", "All", "Any kind of asset"),
+            ("prop", "Prop", "Prop meshes"),
+            ("map", "Map", "Map meshes"),
+            ("wcm", "Weapon/Character", "Weapon/character meshes"),
+            ("anim", "Animation", "Animation files"),
+            ("skel", "Skeleton", "Skeleton files"),
+        ),
+        default="ALL",
+    )  # type: ignore
+    results: bpy.props.CollectionProperty(type=CatalogResultItem)  # type: ignore
+
+
+class ScanCatalogClass(bpy.types.Operator):
+    """Index the headers of every asset in a folder into the catalog"""
+
+    bl_idname = "import.pmt_catalog_scan"
+    bl_label = "Scan Asset Folder"
+    bl_options = {"REGISTER"}
+
+    # Folder to scan
+    directory: bpy.props.StringProperty(subtype="DIR_PATH", default="")  # type: ignore
+    # Worker threads
+    workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Threads reading headers (0 for one per CPU)",
+        default=0,
+        min=0,
+    )  # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        if not os.path.isdir(self.directory):
+            self.report({"ERROR"}, "Folder does not exist")
+            return {"CANCELLED"}
+
+        db_path = catalog_path(context.scene.pmt_catalog)
+        scanned, unchanged, removed = utils.scan_tree(db_path, self.directory, self.workers)
+        self.report(
+            {"INFO"}, f"Catalog: {scanned} scanned, {unchanged} unchanged, {removed} removed"
+        )
+        return {"FINISHED"}
+
+
+class SearchCatalogClass(bpy.types.Operator):
+    """Search the asset catalog"""
+
+    bl_idname = "import.pmt_catalog_search"
+    bl_label = "Search Catalog"
+    bl_options = {"REGISTER"}
+
+    def execute(self, context):
+        settings = context.scene.pmt_catalog
+        kind = None if settings.search_kind == "ALL" else settings.search_kind
+        rows = utils.search(catalog_path(settings), settings.search_text, kind)
+
+        settings.results.clear()
+        for row in rows:
+            item = settings.results.add()
+            item.name = row["path"]
+            item.kind = row["kind"]
+            summary = ", ".join(f"{key} {value}" for key, value in row["summary"].items())
+            item.detail = f"{os.path.basename(row['path'])} ({summary})"
+        log.debug("<<< Catalog search found %s files", len(rows))
+        self.report({"INFO"}, f"Found {len(rows)} files")
+        return {"FINISHED"}
+
+
+class ImportCatalogEntryClass(bpy.types.Operator):
+    """Import a file found in the catalog"""
+
+    bl_idname = "import.pmt_catalog_import"
+    bl_label = "Import Catalog Entry"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH", default="")  # type: ignore
+    kind: bpy.props.StringProperty(default="")  # type: ignore
+
+    def execute(self, context):
+        operator_name = IMPORT_OPERATORS.get(self.kind)
+        if operator_name is None or not os.path.isfile(self.filepath):
+            self.report({"ERROR"}, f"Cannot import {self.kind or 'unknown'} entry")
+            return {"CANCELLED"}
+
+        # bpy.ops.import is not valid syntax
+        import_operator = getattr(getattr(bpy.ops, "import"), operator_name)
+        return import_operator("EXEC_DEFAULT", filepath=self.filepath)
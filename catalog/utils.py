@@ -0,0 +1,383 @@
+# catalog\utils.py
+"""Header-only scanning of asset trees into a SQLite catalog (no bpy)."""
+
+import json
+import mmap
+import os
+import sqlite3
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from ..anim import reader as anim_reader
+from ..log import log
+from ..mesh_map import utils as map_utils
+from ..mesh_prop import utils as prop_utils
+from ..mesh_wcm import utils as wcm_utils
+from ..skel import reader as skel_reader
+
+# Extensions the scanner looks at
+SCAN_EXTENSIONS = (".mesh", ".anim", ".skel")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    mtime_ns INTEGER,
+    size INTEGER,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT,
+    kind TEXT,
+    idx INTEGER,
+    name TEXT,
+    vertices INTEGER,
+    faces INTEGER,
+    frames INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_path ON entries(path);
+CREATE INDEX IF NOT EXISTS entries_name ON entries(name);
+"""
+
+
+class QuietReporter:
+    """Reporter that drops the messages of the format readers"""
+
+    def report(self, report_type, message):
+        pass
+
+
+def open_catalog(db_path):
+    """Open (and create) a catalog database"""
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def probe_wcm(data):
+    """Return the name table of a weapon/character mesh, or None for other files"""
+    if len(data) < 8:
+        return None
+    count = struct.unpack_from("<I", data, 0)[0]
+    if not 0 < count <= 4096:
+        return None
+
+    names = []
+    offset = 4
+    for _ in range(count):
+        if offset + 4 > len(data):
+            return None
+        name_length = struct.unpack_from("<I", data, offset)[0]
+        if not 0 < name_length <= 255 or offset + 4 + name_length > len(data):
+            return None
+        try:
+            names.append(data[offset + 4: offset + 4 + name_length].decode("ascii"))
+        except UnicodeDecodeError:
+            return None
+        offset += 4 + name_length
+
+    # The count is repeated after the table
+    if offset + 4 > len(data) or struct.unpack_from("<I", data, offset)[0] != count:
+        return None
+    return names
+
+
+def block_info(index, name, vertices_offset, vertex_count, byte_size, faces_size):
+    """Location of one submesh's vertex block, with its vertex and face counts"""
+    return {
+        "index": index,
+        "name": name,
+        "vertices_offset": vertices_offset,
+        "vertex_count": vertex_count,
+        "stride": byte_size // vertex_count if vertex_count else 0,
+        "face_count": faces_size // 12,
+    }
+
+
+def locate_wcm(data):
+    """Vertex block and size of every submesh of a weapon/character mesh
+
+    Submeshes are found by walking the headers up to the count of the first
+    one; the name table at the start of the file holds bone names.
+    """
+    blocks = []
+    read_head_temp = wcm_utils.read_dynamic_head(QuietReporter(), data)
+    if not isinstance(read_head_temp, tuple):
+        return blocks
+    data_start = read_head_temp[0]
+
+    first_obj_number = None
+    obj_index = 0
+    while True:
+        head = wcm_utils.read_head(data, data_start)
+        if head is None:
+            break
+        mesh_obj_number, _, mesh_matrices_number, mesh_byte_size = head
+        if first_obj_number is None:
+            first_obj_number = mesh_obj_number
+        faces_size_offset = data_start + 0x1D + mesh_byte_size
+        if faces_size_offset + 4 > len(data):
+            break
+        faces_data_size = struct.unpack_from("<I", data, faces_size_offset)[0]
+        blocks.append(
+            block_info(
+                obj_index,
+                str(obj_index),
+                data_start + 0x1D,
+                mesh_matrices_number,
+                mesh_byte_size,
+                faces_data_size,
+            )
+        )
+        # Hop to the next header
+        data_start = faces_size_offset + 4 + faces_data_size
+        obj_index += 1
+        if obj_index >= first_obj_number - 1:
+            break
+    return blocks
+
+
+def is_prop_layout(data):
+    """Whether the second object directly follows the first (props) or not (maps)"""
+    head = map_utils.read_head(QuietReporter(), data, 24)
+    if head is None:
+        return True
+    _, _, mesh_byte_size = head
+    faces_size_offset = 24 + 0x1D + mesh_byte_size
+    if faces_size_offset + 4 > len(data):
+        return True
+    next_start = faces_size_offset + 4 + struct.unpack_from("<I", data, faces_size_offset)[0]
+    if next_start >= len(data):
+        return True
+
+    # A plausible header right after the faces means there is no material block
+    head = map_utils.read_head(QuietReporter(), data, next_start)
+    if head is None:
+        return False
+    _, mesh_matrices_number, mesh_byte_size = head
+    return (
+        mesh_matrices_number > 0
+        and mesh_byte_size == mesh_matrices_number * 52
+        and next_start + 0x1D + mesh_byte_size <= len(data)
+    )
+
+
+def locate_prop(data):
+    """Vertex block and size of every object of a prop mesh"""
+    blocks = []
+    data_start = 24
+    for obj_index in range(prop_utils.count_objects(data)):
+        if data_start + 0x1D > len(data):
+            break
+        _, _, mesh_matrices_number, mesh_byte_size = prop_utils.read_head(
+            QuietReporter(), data, data_start
+        )
+        faces_size_offset = data_start + 0x1D + mesh_byte_size
+        if faces_size_offset + 4 > len(data):
+            break
+        faces_data_size = struct.unpack_from("<I", data, faces_size_offset)[0]
+        blocks.append(
+            block_info(
+                obj_index,
+                str(obj_index),
+                data_start + 0x1D,
+                mesh_matrices_number,
+                mesh_byte_size,
+                faces_data_size,
+            )
+        )
+        data_start = faces_size_offset + 4 + faces_data_size
+    return blocks
+
+
+def locate_map(data):
+    """Vertex block and size of every located object of a map mesh"""
+    return [
+        block_info(
+            obj_index,
+            str(obj_index),
+            region["vertices_offset"],
+            region["mesh_matrices_number"],
+            region["mesh_byte_size"],
+            region["faces_size"],
+        )
+        for obj_index, region in enumerate(map_utils.locate_objects(QuietReporter(), data))
+    ]
+
+
+def locate_submeshes(kind, data):
+    """Vertex blocks of a wcm, prop or map file, without decoding them"""
+    if kind == "wcm":
+        return locate_wcm(data)
+    if kind == "prop":
+        return locate_prop(data)
+    return locate_map(data)
+
+
+def detect_kind(path, data):
+    """Asset kind of a file: wcm, prop, map, anim or skel"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".anim", ".skel"):
+        return extension[1:]
+    if probe_wcm(data) is not None:
+        return "wcm"
+    return "prop" if is_prop_layout(data) else "map"
+
+
+def decode_submeshes(kind, data):
+    """Fully decode the submeshes of a wcm, prop or map file"""
+    reporter = QuietReporter()
+    if kind == "wcm":
+        return wcm_utils.split_mesh(reporter, data)
+    if kind == "prop":
+        return prop_utils.split_mesh(reporter, data)
+    return map_utils.split_mesh(reporter, data)
+
+
+def decode_indexed(kind, data):
+    """Decoded submeshes keyed by the index their objects are tagged with"""
+    submeshes = decode_submeshes(kind, data)
+    if kind == "wcm":
+        # Index in the header walk
+        return {this_obj.index: this_obj for this_obj in submeshes}
+    return dict(enumerate(submeshes))
+
+
+def scan_file(path):
+    """Read the headers of one asset, returning (kind, summary, entries)"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return "empty", {}, []
+        # Only the pages the header readers touch are loaded
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if extension == ".anim":
+                file_name = os.path.splitext(os.path.basename(path))[0]
+                groups = anim_reader.locate_groups(data, file_name)
+                entries = [
+                    ("group", i, group["name"], None, None, group["frames"])
+                    for i, group in enumerate(groups)
+                ]
+                frames = max((group["frames"] for group in groups), default=0)
+                return "anim", {"groups": len(groups), "frames": frames}, entries
+
+            if extension == ".skel":
+                names = skel_reader.read_skeleton(data[:])["names"]
+                entries = [("bone", i, name, None, None, None) for i, name in enumerate(names)]
+                return "skel", {"bones": len(names)}, entries
+
+            kind = detect_kind(path, data)
+            entries = [
+                ("submesh", block["index"], block["name"], block["vertex_count"], block["face_count"], None)
+                for block in locate_submeshes(kind, data)
+            ]
+            if kind == "wcm":
+                # The bone names of the name table are searchable too
+                names = [("name", i, name, None, None, None) for i, name in enumerate(probe_wcm(data))]
+                entries = names + entries
+
+    submeshes = [entry for entry in entries if entry[0] == "submesh"]
+    summary = {
+        "objects": len(submeshes),
+        "vertices": sum(entry[3] for entry in submeshes),
+        "faces": sum(entry[4] for entry in submeshes),
+    }
+    return kind, summary, entries
+
+
+def scan_safely(path):
+    """scan_file that turns failures into an 'error' kind"""
+    try:
+        return scan_file(path)
+    except Exception as e:
+        log.debug("! Failed to scan %s: %s", path, e)
+        return "error", {"error": str(e)}, []
+
+
+def scan_tree(db_path, root, workers=0):
+    """Index every asset under root, rescanning only new or changed files
+
+    Returns (scanned, unchanged, removed) counts.
+    """
+    connection = open_catalog(db_path)
+    try:
+        # Files on disk with their change stamps
+        found = {}
+        for directory, _, file_names in os.walk(root):
+            for file_name in file_names:
+                if file_name.lower().endswith(SCAN_EXTENSIONS):
+                    path = os.path.join(directory, file_name)
+                    stat = os.stat(path)
+                    found[path] = (stat.st_mtime_ns, stat.st_size)
+
+        # Compare with the catalog
+        prefix = os.path.join(os.path.abspath(root), "")
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in connection.execute(
+                "SELECT path, mtime_ns, size FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+        }
+        found = {os.path.abspath(path): stamp for path, stamp in found.items()}
+        changed = [path for path, stamp in found.items() if known.get(path) != stamp]
+        removed = [path for path in known if path not in found]
+
+        # Headers are read in parallel, rows are written on this thread
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            results = pool.map(scan_safely, changed)
+            with connection:
+                for path in removed:
+                    connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                    connection.execute("DELETE FROM entries WHERE path = ?", (path,))
+                for path, (kind, summary, entries) in zip(changed, results):
+                    mtime_ns, size = found[path]
+                    connection.execute("DELETE FROM entries WHERE path = ?", (path,))
+                    connection.execute(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                        (path, kind, mtime_ns, size, json.dumps(summary)),
+                    )
+                    connection.executemany(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(path, *entry) for entry in entries],
+                    )
+    finally:
+        connection.close()
+
+    log.debug(
+        "<<< Catalog scan: %s scanned, %s unchanged, %s removed",
+        len(changed), len(found) - len(changed), len(removed),
+    )
+    return len(changed), len(found) - len(changed), len(removed)
+
+
+def search(db_path, text, kind=None, limit=50):
+    """Find files whose path or entry names contain text, returning dict rows"""
+    if not os.path.exists(db_path):
+        return []
+    pattern = f"%{text}%"
+    query = (
+        "SELECT f.path, f.kind, f.summary, GROUP_CONCAT(DISTINCT e.name) "
+        "FROM files f LEFT JOIN entries e ON e.path = f.path AND e.name LIKE ? "
+        "WHERE (f.path LIKE ? OR e.name IS NOT NULL)"
+    )
+    parameters = [pattern, pattern]
+    if kind:
+        query += " AND f.kind = ?"
+        parameters.append(kind)
+    query += " GROUP BY f.path ORDER BY f.path LIMIT ?"
+    parameters.append(limit)
+
+    connection = open_catalog(db_path)
+    try:
+        return [
+            {
+                "path": path,
+                "kind": kind,
+                "summary": json.loads(summary or "{}"),
+                "matches": matches.split(",") if matches else [],
+            }
+            for path, kind, summary, matches in connection.execute(query, parameters)
+        ]
+    finally:
+        connection.close()
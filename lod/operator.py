@@ -0,0 +1,214 @@
+# lod\operator.py
+import json
+import os
+import queue
+import threading
+
+import bpy
+
+from . import utils
+from .. import builder
+from ..catalog import utils as catalog_utils
+from ..log import log
+
+# Decoded finer levels waiting for the main thread
+_decoded = queue.Queue()
+# Threads still decoding levels
+_workers = []
+
+
+def decode_file(path):
+    """Decoded submeshes of a mesh file, keyed by object index"""
+    with open(path, "rb") as file:
+        data = file.read()
+    return catalog_utils.decode_indexed(catalog_utils.detect_kind(path, data), data)
+
+
+def decode_levels(object_names, levels):
+    """Worker thread: decode levels in order and queue them for building"""
+    for level, path in levels:
+        try:
+            submeshes = decode_file(path)
+        except Exception as e:
+            log.debug("! Failed to decode LOD %s: %s", path, e)
+            continue
+        _decoded.put((object_names, level, path, submeshes))
+        log.debug("> Decoded LOD %s: %s", level, path)
+
+
+def build_decoded_levels():
+    """Timer callback: build the meshes of one decoded level per tick"""
+    try:
+        object_names, level, path, submeshes = _decoded.get_nowait()
+    except queue.Empty:
+        _workers[:] = [worker for worker in _workers if worker.is_alive()]
+        # Keep polling while something is still decoding
+        return 0.1 if _workers else None
+
+    for index, name in object_names.items():
+        obj = bpy.data.objects.get(name)
+        this_obj = submeshes.get(index)
+        if obj is not None and this_obj is not None:
+            store_level(obj, level, path, builder.build_mesh(f"{name}_lod{level}", this_obj), this_obj)
+    log.debug(
+        "<<< Built LOD %s for %s objects, fixes: %s",
+        level, len(object_names), builder.take_sanitation(),
+    )
+    return 0.0
+
+
+def store_level(obj, level, path, mesh, this_obj):
+    """Keep a level's mesh on the object so it can be swapped in later"""
+    if mesh is not obj.data:
+        mesh["pmt_hash"] = builder.mesh_key(this_obj)
+        for material in obj.data.materials:
+            mesh.materials.append(material)
+        if this_obj.bone_indices is not None and len(obj.vertex_groups):
+            # Weights live on the mesh, written through the object
+            current = obj.data
+            obj.data = mesh
+            builder.apply_skin(obj, this_obj)
+            obj.data = current
+
+    # The ID property also keeps the mesh alive while it is not shown
+    obj[f"pmt_lod{level}"] = mesh
+    paths = json.loads(obj.get("pmt_lod_paths", "{}"))
+    paths[str(level)] = path
+    obj["pmt_lod_paths"] = json.dumps(paths)
+
+
+def lod_levels(obj):
+    """Levels whose meshes an object holds"""
+    paths = json.loads(obj.get("pmt_lod_paths", "{}"))
+    return sorted(int(level) for level in paths if obj.get(f"pmt_lod{level}") is not None)
+
+
+def set_level(obj, level):
+    """Show a stored level, pointing reimports at its file"""
+    mesh = obj.get(f"pmt_lod{level}")
+    if mesh is None:
+        return False
+    obj.data = mesh
+    obj["pmt_lod"] = level
+    obj["pmt_source"] = json.loads(obj["pmt_lod_paths"])[str(level)]
+    return True
+
+
+class ImportLodSetClass(bpy.types.Operator):
+    """Import the coarsest level of a _lodN set now and the finer levels in the background"""
+
+    bl_idname = "import.pmt_lod_set"
+    bl_label = "Import LOD Set"
+    bl_options = {"REGISTER", "UNDO"}
+
+    # Any level of the set
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH", default="")  # type: ignore
+    filter_glob: bpy.props.StringProperty(default="*.mesh", options={"HIDDEN"})  # type: ignore
+    # Vertex groups for skinned meshes
+    import_skin: bpy.props.BoolProperty(
+        name="Import Skin",
+        description="Create vertex groups from the bone weights of skinned meshes",
+        default=True,
+    )  # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        if not os.path.isfile(self.filepath):
+            self.report({"ERROR"}, "File does not exist. Check the path")
+            return {"CANCELLED"}
+        levels = utils.find_lod_set(self.filepath)
+
+        # The coarsest level decodes and builds fastest
+        coarsest = max(levels)
+        try:
+            submeshes = decode_file(levels[coarsest])
+        except Exception as e:
+            self.report({"ERROR"}, f"Failed to load model: {e}")
+            return {"CANCELLED"}
+
+        base_name = utils.split_lod_name(self.filepath)[0]
+        object_names = {}
+        for index, this_obj in submeshes.items():
+            obj = builder.build_mesh_object(
+                context, f"{this_obj.name or base_name}_{index}", this_obj, skin=self.import_skin
+            )
+            builder.tag_object(obj, levels[coarsest], index)
+            store_level(obj, coarsest, levels[coarsest], obj.data, this_obj)
+            obj["pmt_lod"] = coarsest
+            object_names[index] = obj.name
+
+        # Finer levels, coarsest first, decoded off the main thread
+        finer = [(level, levels[level]) for level in sorted(levels, reverse=True) if level != coarsest]
+        if finer:
+            worker = threading.Thread(target=decode_levels, args=(object_names, finer), daemon=True)
+            worker.start()
+            _workers.append(worker)
+            if not bpy.app.timers.is_registered(build_decoded_levels):
+                bpy.app.timers.register(build_decoded_levels, first_interval=0.1)
+
+        builder.report_sanitation(self)
+        self.report(
+            {"INFO"}, f"Loaded LOD {coarsest} of {base_name}, {len(finer)} more levels loading"
+        )
+        return {"FINISHED"}
+
+
+class SwapLodClass(bpy.types.Operator):
+    """Show another level of detail on LOD objects"""
+
+    bl_idname = "import.pmt_lod_swap"
+    bl_label = "Swap LOD"
+    bl_options = {"REGISTER", "UNDO"}
+
+    # How the level is chosen
+    mode: bpy.props.EnumProperty(
+        name="Mode",
+        items=(
+            ("LEVEL", "Level", "Show the loaded level closest to the given one"),
+            ("CAMERA", "Camera Distance", "Pick the level of every object by its distance to the camera"),
+        ),
+        default="LEVEL",
+    )  # type: ignore
+    # Requested level
+    level: bpy.props.IntProperty(
+        name="Level",
+        description="Level to show, 0 being the finest",
+        default=0,
+        min=0,
+    )  # type: ignore
+    # Distance per level
+    distance_step: bpy.props.FloatProperty(
+        name="Distance Step",
+        description="Camera distance covered by each level, finest first",
+        default=10.0,
+        min=0.01,
+    )  # type: ignore
+
+    def execute(self, context):
+        # Selected LOD objects, or all of them in the scene
+        objects = [obj for obj in context.selected_objects if "pmt_lod" in obj]
+        if not objects:
+            objects = [obj for obj in context.scene.objects if "pmt_lod" in obj]
+        camera = context.scene.camera
+        if self.mode == "CAMERA" and camera is None:
+            self.report({"ERROR"}, "The scene has no camera")
+            return {"CANCELLED"}
+
+        swapped = 0
+        for obj in objects:
+            levels = lod_levels(obj)
+            if not levels:
+                continue
+            if self.mode == "CAMERA":
+                distance = (obj.matrix_world.translation - camera.matrix_world.translation).length
+                level = utils.level_for_distance(distance, levels, self.distance_step)
+            else:
+                level = min(levels, key=lambda available: abs(available - self.level))
+            if level != obj["pmt_lod"] and set_level(obj, level):
+                swapped += 1
+
+        self.report({"INFO"}, f"Swapped {swapped} of {len(objects)} objects")
+        return {"FINISHED"}
@@ -0,0 +1,50 @@
+# lod\utils.py
+"""Detection of sibling _lodN files forming a level-of-detail set (no bpy)."""
+
+import os
+import re
+
+# name_lod<N>.ext, level 0 being the finest
+LOD_PATTERN = re.compile(r"^(?P<base>.+)_lod(?P<level>\d+)$", re.IGNORECASE)
+
+
+def split_lod_name(path):
+    """(base name, level) of a _lodN file, or (name, None) for other files"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = LOD_PATTERN.match(name)
+    if match is None:
+        return name, None
+    return match.group("base"), int(match.group("level"))
+
+
+def find_lod_set(path):
+    """Every level of the set path belongs to, as {level: path}
+
+    Siblings in the same folder with the same base name and extension form
+    the set. A file outside any set is returned as its own level 0.
+    """
+    base, level = split_lod_name(path)
+    if level is None:
+        return {0: path}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    extension = os.path.splitext(path)[1].lower()
+    levels = {}
+    for file_name in os.listdir(directory):
+        if os.path.splitext(file_name)[1].lower() != extension:
+            continue
+        sibling_base, sibling_level = split_lod_name(file_name)
+        if sibling_level is not None and sibling_base.lower() == base.lower():
+            levels[sibling_level] = os.path.join(directory, file_name)
+    return dict(sorted(levels.items()))
+
+
+def level_for_distance(distance, levels, step):
+    """Finest level for objects up to step away, one level coarser per step after that"""
+    levels = sorted(levels)
+    if not levels:
+        return None
+    wanted = int(distance // step) if step > 0 else 0
+    # The closest available level at or below the wanted one, else the finest
+    fitting = [level for level in levels if level <= wanted]
+    return fitting[-1] if fitting else levels[0]
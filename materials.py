@@ -0,0 +1,94 @@
+# materials.py
+import os
+
+import bpy
+
+from .log import log
+
+# Materials and images created this session
+_material_cache = {}
+_image_cache = {}
+
+
+def find_texture(path, base_dir):
+    """Resolve a game texture path against the folders above the imported file"""
+    relative = path.replace("\\", "/").lstrip("/")
+    folder = os.path.abspath(base_dir)
+    while True:
+        candidate = os.path.join(folder, relative)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+
+    # Texture next to the imported file
+    candidate = os.path.join(base_dir, os.path.basename(relative))
+    if os.path.isfile(candidate):
+        return candidate
+    return None
+
+
+def load_image(path, base_dir):
+    """Load a texture once per session"""
+    file_path = find_texture(path, base_dir)
+    if file_path is None:
+        log.debug("! Texture not found: %s", path)
+        return None
+
+    image = bpy.data.images.get(_image_cache.get(file_path, ""))
+    if image is None:
+        image = bpy.data.images.load(file_path, check_existing=True)
+        _image_cache[file_path] = image.name
+    return image
+
+
+def get_material(descriptor, base_dir):
+    """Return the material of a descriptor, creating it once per session"""
+    material = bpy.data.materials.get(_material_cache.get(descriptor["hash"], ""))
+    if material is not None and material.get("pmt_hash") == descriptor["hash"]:
+        return material
+
+    # Name after the first texture, else the first shader
+    if descriptor["textures"]:
+        name = os.path.splitext(os.path.basename(descriptor["textures"][0][1]))[0]
+    elif descriptor["shaders"]:
+        name = descriptor["shaders"][0]
+    else:
+        name = "PMT_Material"
+
+    material = bpy.data.materials.new(name)
+    material["pmt_hash"] = descriptor["hash"]
+    material["pmt_shaders"] = list(descriptor["shaders"])
+    material.use_nodes = True
+
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    bsdf = nodes.get("Principled BSDF")
+
+    # One image node per texture slot, the color map drives base color
+    color_linked = False
+    for i, (slot, path) in enumerate(descriptor["textures"]):
+        node = nodes.new("ShaderNodeTexImage")
+        node.label = slot or os.path.basename(path)
+        node.location = (-400, 300 - i * 280)
+        node.image = load_image(path, base_dir)
+        if bsdf is not None and not color_linked and (not slot or "color" in slot.lower()):
+            links.new(node.outputs["Color"], bsdf.inputs["Base Color"])
+            color_linked = True
+
+    _material_cache[descriptor["hash"]] = material.name
+    return material
+
+
+def assign_materials(mesh, descriptors, base_dir):
+    """Append the materials of descriptors to a mesh that has none yet
+
+    None descriptors become empty slots, so face material indices still line
+    up; a mesh whose descriptors are all None gets no slots.
+    """
+    if mesh.materials or all(descriptor is None for descriptor in descriptors):
+        return
+    for descriptor in descriptors:
+        mesh.materials.append(None if descriptor is None else get_material(descriptor, base_dir))
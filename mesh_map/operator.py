@@ -1,14 +1,45 @@
 # mesh_map\operator.py
+import itertools
 import math
 import os
 
 import bpy
+import numpy as np
 
 from . import utils
+from .. import materials
+from ..background import BackgroundImportMixin
+from ..cache import CachedImportMixin
+from ..builder import build_mesh_object, report_sanitation, tag_object
+from ..log import log
+
+
+# Build a bounding box placeholder
+def build_placeholder(context, name, bounds):
+    """Create and link a box empty standing in for a map object"""
+    # Box center and half size in map space
+    center = (bounds[0] + bounds[1]) / 2
+    half_size = np.maximum((bounds[1] - bounds[0]) / 2, 1e-3)
+
+    # Create empty drawn as a box
+    new_obj = bpy.data.objects.new(name, None)
+    new_obj.empty_display_type = "CUBE"
+    new_obj.empty_display_size = 1.0
+
+    # Link object to scene
+    context.collection.objects.link(new_obj)
+
+    # Same transform as the mesh objects, applied to the box
+    new_obj.rotation_mode = "XYZ"
+    new_obj.rotation_euler = (math.radians(90), 0, 0)
+    new_obj.location = utils.map_to_world(center)
+    new_obj.scale = half_size
+
+    return new_obj
 
 
 # Operator definition
-class ImportMeshMapClass(bpy.types.Operator):
+class ImportMeshMapClass(CachedImportMixin, BackgroundImportMixin, bpy.types.Operator):
     """Import a .mesh file"""
 
     bl_idname = "import.mesh_map"
@@ -19,6 +50,110 @@ class ImportMeshMapClass(bpy.types.Operator):
     # Extension filter
     filename_ext = ".mesh"
     filter_glob: bpy.props.StringProperty(default="*.mesh", options={"HIDDEN"})  # type: ignore
+    # Decode objects in parallel
+    parallel_decode: bpy.props.BoolProperty(
+        name="Parallel Decode",
+        description="Locate all objects first, then decode them on a thread pool",
+        default=True,
+    )  # type: ignore
+    # Worker thread count
+    decode_workers: bpy.props.IntProperty(
+        name="Decode Threads",
+        description="Number of decode threads (0 = one per CPU core)",
+        default=0,
+        min=0,
+    )  # type: ignore
+    # Only import objects near a point
+    import_region: bpy.props.BoolProperty(
+        name="Region of Interest",
+        description="Only import objects whose bounds intersect a box",
+        default=False,
+    )  # type: ignore
+    # Region center
+    region_source: bpy.props.EnumProperty(
+        name="Region Center",
+        items=(
+            ("CURSOR", "3D Cursor", "Box around the 3D cursor"),
+            ("ACTIVE", "Active Object", "Box around the active object (an empty uses its display size)"),
+        ),
+        default="CURSOR",
+    )  # type: ignore
+    # Region half size
+    region_size: bpy.props.FloatProperty(
+        name="Region Size",
+        description="Half size of the region box",
+        default=50.0,
+        min=0.0,
+    )  # type: ignore
+    # Placeholders for skipped objects
+    create_placeholders: bpy.props.BoolProperty(
+        name="Placeholders",
+        description="Add bounding box empties for objects outside the region",
+        default=True,
+    )  # type: ignore
+    # Merge objects on import
+    merge_mode: bpy.props.EnumProperty(
+        name="Merge",
+        items=(
+            ("NONE", "None", "One Blender object per map object"),
+            ("MAP", "Whole Map", "Merge all objects into a single mesh"),
+            ("GRID", "Grid Cells", "Merge objects into one mesh per grid cell"),
+        ),
+        default="NONE",
+    )  # type: ignore
+    # Grid cell size for merging
+    merge_cell_size: bpy.props.FloatProperty(
+        name="Cell Size",
+        description="Size of the grid cells used to merge objects",
+        default=100.0,
+        min=0.001,
+    )  # type: ignore
+    # Share meshes between identical objects
+    instance_duplicates: bpy.props.BoolProperty(
+        name="Instance Duplicates",
+        description="Objects with byte-identical data share one mesh, also across imports",
+        default=True,
+    )  # type: ignore
+    # Create materials from the shader/texture blocks
+    import_materials: bpy.props.BoolProperty(
+        name="Materials",
+        description="Decode shader and texture blocks into shared materials",
+        default=True,
+    )  # type: ignore
+    # Weld seam-split vertices
+    weld_vertices: bpy.props.BoolProperty(
+        name="Weld Vertices",
+        description="Merge coincident vertices before building, keeping UVs and normals per face corner",
+        default=False,
+    )  # type: ignore
+    # Weld distance
+    weld_distance: bpy.props.FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this are merged",
+        default=1e-5,
+        min=1e-7,
+        precision=6,
+    )  # type: ignore
+    # Import in the background
+    background: bpy.props.BoolProperty(
+        name="Background Import",
+        description="Parse on a worker thread and add objects gradually (Esc to cancel)",
+        default=False,
+    )  # type: ignore
+
+    def region_box(self, context):
+        """Return the region box in map space"""
+        half_size = self.region_size
+        if self.region_source == "ACTIVE" and context.active_object is not None:
+            obj = context.active_object
+            center = obj.matrix_world.translation
+            if obj.type == "EMPTY":
+                half_size = obj.empty_display_size * max(obj.matrix_world.to_scale())
+        else:
+            center = context.scene.cursor.location
+
+        center = np.array(utils.world_to_map(center), dtype=np.float32)
+        return center - half_size, center + half_size
 
     def execute(self, context):
         # Remove objects from the scene
@@ -41,67 +176,35 @@ class ImportMeshMapClass(bpy.types.Operator):
             # File name without extension
             mesh_name = os.path.splitext(os.path.basename(file_path))[0]
 
-            # Split mesh data
-            mesh_obj = utils.split_mesh(self, data)
-
-            # Loop index
-            idx = 0
-            # Read data blocks
-            for this_obj in mesh_obj:
-                # Vertex data
-                vertices = this_obj["vertices"]["data"]
-                # Face data
-                faces = this_obj["faces"]["data"]
-                # Normal data
-                normals = this_obj["normals"]
-                # UV coordinates
-                uvs = this_obj["uvs"]
-
-                # Create new mesh
-                new_mesh = bpy.data.meshes.new(f"{mesh_name}_{idx}")
-                new_obj = bpy.data.objects.new(f"{mesh_name}_{idx}", new_mesh)
-
-                # Link object to scene
-                context.collection.objects.link(new_obj)
-
-                # Create vertices and faces
-                new_mesh.from_pydata(vertices, [], faces)
-
-                # Create UV layer
-                uv_layer = new_mesh.uv_layers.new(name="UVMap")
-
-                # Set UV for each loop
-                for face in new_mesh.polygons:
-                    for loop_idx in face.loop_indices:
-                        # Vertex index
-                        vertex_idx = new_mesh.loops[loop_idx].vertex_index
-                        # Set UV
-                        uv_layer.data[loop_idx].uv = uvs[vertex_idx]
-
-                # Enable smooth shading
-                new_mesh.shade_smooth()
-
-                # Prepare normals
-                loop_normals = []
-                for poly in new_mesh.polygons:
-                    for vertex_idx in poly.vertices:
-                        loop_normals.append(normals[vertex_idx])
-
-                # Set custom normals
-                new_mesh.normals_split_custom_set(loop_normals)
-
-                # Update mesh
-                new_mesh.update()
-
-                # Set object location
-                new_obj.location = (0, 0, 0)
-                # Use Euler rotation mode
-                new_obj.rotation_mode = "XYZ"
-                # Rotate X by 90 degrees (radians)
-                new_obj.rotation_euler = (math.radians(90), 0, 0)
-
-                # Increment index
-                idx += 1
+            # Parse settings, read here because the plan may run on a worker thread
+            options = {
+                "region_box": self.region_box(context) if self.import_region else None,
+                "parallel": self.parallel_decode,
+                "workers": self.decode_workers if self.parallel_decode else 1,
+                "merge_mode": self.merge_mode,
+                "cell_size": self.merge_cell_size,
+                "placeholders": self.create_placeholders,
+            }
+
+            # Reuse the snapshot of an identical earlier import
+            if self.use_cache and self.load_from_cache(context, data, options) is not None:
+                self.report({"INFO"}, "Model loaded from cache")
+                return {"FINISHED"}
+
+            if self.background:
+                return self.start_background(
+                    context,
+                    mesh_name,
+                    lambda reporter: self.plan_items(reporter, options, file_path, data, mesh_name),
+                )
+
+            # Build while the next objects are decoded
+            objects = self.build_pipelined(
+                context,
+                lambda reporter: self.plan_items(reporter, options, file_path, data, mesh_name),
+            )
+            if self.use_cache:
+                self.save_to_cache(objects)
 
             self.report({"INFO"}, "Model loaded successfully")
             return {"FINISHED"}
@@ -110,8 +213,166 @@ class ImportMeshMapClass(bpy.types.Operator):
             utils.traceback.print_exc()
             return {"CANCELLED"}
 
+    @staticmethod
+    def plan_items(reporter, options, file_path, data, mesh_name):
+        """Return (count, items) to build; does not touch bpy"""
+        placeholders = []
+        if options["region_box"] is not None:
+            # Cached regions, bounds and grid of this file
+            map_index = utils.get_map_index(reporter, file_path, data)
+            regions = map_index["regions"]
+
+            # Decode only the objects inside the region
+            inside = map_index["grid"].query(*options["region_box"])
+            log.debug("> Region selects %s of %s objects", len(inside), len(regions))
+            decoded = utils.iter_decode_objects(
+                data, [regions[i] for i in inside], options["workers"]
+            )
+            pairs = ((idx, this_obj) for idx, this_obj in zip(inside, decoded) if this_obj is not None)
+            count = len(inside)
+
+            # Box empties for everything else
+            if options["placeholders"]:
+                inside_set = set(inside)
+                placeholders = [
+                    {
+                        "kind": "placeholder",
+                        "name": f"{mesh_name}_{idx}",
+                        "index": idx,
+                        "bounds": map_index["bounds"][idx],
+                    }
+                    for idx in range(len(regions))
+                    if idx not in inside_set
+                ]
+        elif options["parallel"]:
+            # Locate all objects, then decode them on a thread pool
+            regions = utils.locate_objects(reporter, data)
+            decoded = utils.iter_decode_objects(data, regions, options["workers"])
+            # Stop at the first failure, like split_mesh does
+            pairs = enumerate(itertools.takewhile(lambda this_obj: this_obj is not None, decoded))
+            count = len(regions)
+        else:
+            # Split mesh data one object at a time
+            pairs = enumerate(utils.iter_mesh(reporter, data))
+            count = utils.count_objects(data)
+
+        if options["merge_mode"] == "NONE":
+            items = (
+                {"kind": "mesh", "name": f"{mesh_name}_{idx}", "index": idx, "data": this_obj}
+                for idx, this_obj in pairs
+            )
+        else:
+            # Objects merged together
+            pairs = list(pairs)
+            if options["merge_mode"] == "GRID":
+                groups = {
+                    f"{mesh_name}_{x}_{y}_{z}": group
+                    for (x, y, z), group in utils.group_by_cell(pairs, options["cell_size"]).items()
+                }
+            else:
+                groups = {mesh_name: pairs}
+            log.debug("> Merging %s objects into %s meshes", len(pairs), len(groups))
+            count = len(groups)
+            items = (
+                {"kind": "merged", "name": name, "index": None, "data": utils.merge_objects(group)}
+                for name, group in groups.items()
+            )
+
+        return count + len(placeholders), itertools.chain(items, placeholders)
+
+    def build_item(self, context, item):
+        """Build one planned item, returning the created objects"""
+        file_path = self.filepath
+        if item["kind"] == "placeholder":
+            new_obj = build_placeholder(context, item["name"], item["bounds"])
+        else:
+            this_obj = item["data"]
+            if item["kind"] == "merged":
+                new_obj = build_mesh_object(
+                    context, item["name"], this_obj, weld_distance=self.weld_amount()
+                )
+                descriptors = this_obj.materials
+            else:
+                new_obj = build_mesh_object(
+                    context,
+                    item["name"],
+                    this_obj,
+                    self.instance_duplicates,
+                    self.weld_amount(),
+                )
+                descriptors = [this_obj.material]
+            if self.import_materials:
+                materials.assign_materials(new_obj.data, descriptors, os.path.dirname(file_path))
+
+        tag_object(new_obj, file_path, item["index"])
+        return [new_obj]
+
+    def weld_amount(self):
+        """Weld distance, or 0 when welding is off"""
+        return self.weld_distance if self.weld_vertices else 0.0
+
     # Display file selector
     def invoke(self, context, event):
         # Invoke file selector
         context.window_manager.fileselect_add(self)
         return {"RUNNING_MODAL"}
+
+
+# Operator definition
+class ExpandMapPlaceholdersClass(bpy.types.Operator):
+    """Replace selected map placeholders with their meshes"""
+
+    bl_idname = "import.mesh_map_expand"
+    bl_label = "Expand map placeholders"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return any(
+            obj.type == "EMPTY" and "pmt_source" in obj for obj in context.selected_objects
+        )
+
+    def execute(self, context):
+        try:
+            # Placeholders grouped by source file
+            placeholders = {}
+            for obj in context.selected_objects:
+                if obj.type == "EMPTY" and "pmt_source" in obj and "pmt_submesh" in obj:
+                    placeholders.setdefault(obj["pmt_source"], []).append(obj)
+
+            expanded = 0
+            for file_path, objs in placeholders.items():
+                if not os.path.exists(file_path):
+                    self.report({"WARNING"}, f"Missing source file: {file_path}")
+                    continue
+
+                # Read binary file
+                with open(file_path, "rb") as file:
+                    data = file.read()
+                mesh_name = os.path.splitext(os.path.basename(file_path))[0]
+
+                # Decode the objects behind the placeholders
+                regions = utils.get_map_index(self, file_path, data)["regions"]
+                objs = [obj for obj in objs if obj["pmt_submesh"] < len(regions)]
+                decoded = utils.decode_objects(data, [regions[obj["pmt_submesh"]] for obj in objs])
+
+                for obj, this_obj in zip(objs, decoded):
+                    if this_obj is None:
+                        continue
+                    idx = obj["pmt_submesh"]
+                    # Free the name before building the mesh object
+                    bpy.data.objects.remove(obj)
+                    new_obj = build_mesh_object(context, f"{mesh_name}_{idx}", this_obj)
+                    tag_object(new_obj, file_path, idx)
+                    materials.assign_materials(
+                        new_obj.data, [this_obj.material], os.path.dirname(file_path)
+                    )
+                    expanded += 1
+
+            report_sanitation(self)
+            self.report({"INFO"}, f"Expanded {expanded} placeholders")
+            return {"FINISHED"}
+        except Exception as e:
+            self.report({"ERROR"}, f"Failed to expand placeholders: {e}")
+            utils.traceback.print_exc()
+            return {"CANCELLED"}
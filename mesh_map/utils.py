@@ -1,53 +1,41 @@
 # mesh_map\utils.py
+import os
 import struct
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from .. import tools
 from ..log import log
 
 
 def find_next_head(data, data_start):
-    """Find the next object header."""
-    # Record incoming data_start
-    temp_data_start = data_start
+    """Find the next object header.
+
+    Headers are located by the 0xFFFFFFFF marker that ends the first matrix
+    of an object; the search runs in C through data.find (bytes or mmap).
+    """
     log.debug(">>>>>>>>>>>>>>>>>>>>>>>> : %s", hex(data_start))
     data_len = len(data)
     log.debug("DATA size: %s", hex(data_len))
 
-    while True:
-        if data_start >= data_len:
-            log.debug(
-                "<<<<<<<<<<<<<<<<<<<<<<<!!! Next object header not found, start: %s",
-                hex(temp_data_start),
-            )
-            return None
-
-        # Read next value
-        # log.debug("data_start: %s",hex(data_start))
-        tag_ff = data[data_start: data_start + 1][0]
-        # log.debug("tag_ff: %s", hex(tag_ff))
-        # data_start += 1
-        if tag_ff == 0xFF:
-            if data_start + 4 < len(data):  # ensure enough bytes to unpack an int
-                tag_4ff = struct.unpack_from("<I", data, data_start)[0]
-                # log.debug("tag_4ff: %s",hex(tag_4ff))
-                if tag_4ff != 0xFFFFFFFF:
-                    data_start += 1
-                    # log.debug("!= 0xffffffff : %s",hex(data_start))
-                else:
-                    # log.debug("tag_4ff: %s",hex(tag_4ff))
-                    data_start -= 0x30 + 0x1D
-                    log.debug(
-                        "<<<<<<<<<<<<<<<<<<<<<<< Found next object first matrix end %s",
-                        hex(data_start),
-                    )
-                    return data_start
-            else:
-                log.debug("Insufficient data to read")
-                return None
-        else:
-            data_start += 1
-            # log.debug("!= 0xff : %s",hex(data_start))
+    marker = data.find(b"\xff\xff\xff\xff", data_start)
+    # A marker must be followed by at least one more byte
+    if marker == -1 or marker + 4 >= data_len:
+        log.debug(
+            "<<<<<<<<<<<<<<<<<<<<<<<!!! Next object header not found, start: %s",
+            hex(data_start),
+        )
+        return None
+
+    data_start = marker - (0x30 + 0x1D)
+    log.debug(
+        "<<<<<<<<<<<<<<<<<<<<<<< Found next object first matrix end %s",
+        hex(data_start),
+    )
+    return data_start
 
 
 def read_map_first_head(self, data):
@@ -112,12 +100,6 @@ def read_head(self, data, start_index):
 def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
     """Parse vertex data."""
     log.debug(">>> Begin parsing vertex data")
-    # Vertex data
-    vertices = []
-    # Normal data
-    normals = []
-    # UV coordinate data
-    uvs = []
 
     # Block size (0x34)
     block_size = int(mesh_byte_size / mesh_matrices_number)
@@ -132,34 +114,10 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 
     # Parse vertex data
     try:
-        for mni in range(mesh_matrices_number):
-            # Calculate current block start
-            mniv = block_size * mni
-            # Ensure enough bytes to unpack
-            if mniv + block_size <= mesh_byte_size:
-                vx = struct.unpack_from("f", vertices_data, mniv)[0]
-                vy = struct.unpack_from("f", vertices_data, mniv + 4)[0]
-                vz = struct.unpack_from("f", vertices_data, mniv + 8)[0]
-                # Append vertex
-                vertices.append((vx, vy, vz))
-
-                # Read normals
-                nx = tools.read_half_float(vertices_data, mniv + 0x0c)
-                ny = tools.read_half_float(vertices_data, mniv + 0x0e)
-                nz = tools.read_half_float(vertices_data, mniv + 0x10)
-                normals.append((nx, ny, nz))
-                # log.debug(">> 读取法线数据: %s , %s , %s", nx, ny, nz)
-
-                # Read UV coordinates
-                uv_start = mniv + block_size - 0x10
-                # log.debug(">> uv_start: %s , mniv : %s ", uv_start, mniv)
-                u = tools.read_half_float(vertices_data, uv_start)
-                v = tools.read_half_float(vertices_data, uv_start + 0x2)
-                uvs.append((u, 1 - v))
-                # log.debug(">> 读取UV坐标: %s , %s ", u, 1 - v)
-            else:
-                log.debug("! Vertex data parse failed: insufficient bytes at %s", mniv)
-                break
+        # Decode every record of the block at once
+        vertices, normals, uvs = tools.decode_vertex_block(
+            vertices_data, mesh_matrices_number, block_size, block_size - 0x10
+        )
     except Exception as e:
         log.debug("! Vertex data parse failed: %s", e)
         # self.report({"ERROR"}, f"顶点数据解析失败 : {e}")
@@ -176,15 +134,9 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 def read_faces(self, faces_data_block, index_length):
     """Parse face data"""
     log.debug(">>> Begin parsing face data %s", index_length)
-    faces = []
     try:
-        # Ensure there are enough bytes to unpack
-        for i in range(0, index_length, 12):
-            f0 = struct.unpack_from("H", faces_data_block, i)[0]
-            f1 = struct.unpack_from("H", faces_data_block, i + 4)[0]
-            f2 = struct.unpack_from("H", faces_data_block, i + 8)[0]
-            faces.append((f0, f1, f2))
-            # log.debug("> Parsing face: %s -> %s %s %s", i, f0, f1, f2)
+        # Decode every 12-byte record at once
+        faces = tools.decode_faces(faces_data_block, index_length)
     except Exception as e:
         log.debug("! Face data parse failed: %s", e)
         # self.report({"ERROR"}, f"Face data parse failed: {e}")
@@ -192,19 +144,30 @@ def read_faces(self, faces_data_block, index_length):
         # return {"CANCELLED"}
         return None
 
+    # Non-zero upper index halves mean the block was read at the wrong stride
+    misaligned, trailing = tools.check_face_block(faces_data_block, index_length)
+    if misaligned or trailing:
+        log.debug("! Face block: %s misaligned records, %s trailing bytes", misaligned, trailing)
+        self.report(
+            {"WARNING"},
+            f"Face data looks misaligned: {misaligned} records, {trailing} trailing bytes",
+        )
+
     log.debug("<<< Finished reading %s faces", len(faces))
 
     return faces
 
 
 # Split mesh data
-def split_mesh(self, data):
-    """Split mesh data"""
+def iter_mesh(self, data):
+    """Split mesh data, yielding each object as soon as it is decoded"""
     log.debug(">>> Begin splitting mesh data")
     # Data start offset
     data_start = 0
-    # Mesh objects
-    mesh_obj = []
+    # Objects yielded so far
+    obj_count = 0
+    # Object count from the first header
+    first_obj_number = None
 
     # Read dynamic header
     data_index = read_map_first_head(self, data)
@@ -228,6 +191,8 @@ def split_mesh(self, data):
                 break
             # Parsed header -> mesh object count, matrix count and byte size
             mesh_obj_number, mesh_matrices_number, mesh_byte_size = read_head_temp
+            if first_obj_number is None:
+                first_obj_number = mesh_obj_number
 
             # Get vertex data length
             vertices_data = data[data_start + 0x1D: data_start + 0x1D + mesh_byte_size]
@@ -249,6 +214,7 @@ def split_mesh(self, data):
                 break
             # Vertex data, UV data, tangents
             vertices_array, normals, uvs = read_vertices_temp
+            block_size = int(mesh_byte_size / mesh_matrices_number)
 
             # Get face data block size
             faces_data_size = struct.unpack(
@@ -290,19 +256,20 @@ def split_mesh(self, data):
                 # return mesh_obj
                 break
 
-            # Append data to mesh_obj
-            mesh_obj.append(
-                {
-                    "vertices": {
-                        "mesh_obj_number": mesh_obj_number,
-                        "mesh_matrices_number": mesh_matrices_number,
-                        "mesh_byte_size": mesh_byte_size,
-                        "data": vertices_array,
-                    },
-                    "faces": {"size": faces_data_size, "data": faces_array},
-                    "uvs": uvs,
-                    "normals": normals,
-                }
+            # Decoded object
+            this_obj = tools.SubMesh(
+                vertices_array,
+                faces_array,
+                normals,
+                uvs,
+                mesh_obj_number=mesh_obj_number,
+                mesh_matrices_number=mesh_matrices_number,
+                mesh_byte_size=mesh_byte_size,
+                faces_size=faces_data_size,
+                index=obj_count,
+                hash=tools.content_hash(
+                    ("map", block_size, block_size - 0x10), vertices_data, faces_data_block
+                ),
             )
 
             # End position, also the new start
@@ -311,8 +278,15 @@ def split_mesh(self, data):
 
             # Read remaining data (shaders, textures, animation, etc.) -> check for next object header
             find_start = find_next_head(data, data_start)
+            # Decode the material descriptor from that region
+            this_obj.material = tools.parse_material_block(
+                data[data_start: len(data) if find_start is None else find_start]
+            )
+            yield this_obj
+            obj_count += 1
+
             if find_start is None:
-                log.debug("! Next object header not found, mesh_obj len: %s", hex(len(mesh_obj)))
+                log.debug("! Next object header not found, objects: %s", hex(obj_count))
                 break
             data_start = find_start
 
@@ -327,15 +301,407 @@ def split_mesh(self, data):
             # data_start = next_data_start
 
             # Check if end of file reached
-            if len(mesh_obj) >= mesh_obj[0]["vertices"]["mesh_obj_number"] - 1:
+            if obj_count >= first_obj_number - 1:
                 log.debug("<<< Reached end of data")
                 break
 
-        log.debug("Returning mesh_obj")
-        return mesh_obj
+        log.debug("Finished splitting mesh data")
     except Exception as e:
         log.debug("! Failed to split mesh data: %s", e)
         # self.report({"ERROR"}, f"分割网格数据失败: {e}")
         traceback.print_exc()
         # return {"CANCELLED"}
-        return mesh_obj
+
+
+# Split mesh data
+def split_mesh(self, data):
+    """Split mesh data"""
+    return list(iter_mesh(self, data))
+
+
+# Locate object boundaries without decoding
+def locate_objects(self, data):
+    """Locate the vertex and face regions of every object"""
+    log.debug(">>> Begin locating map objects")
+    # Object regions
+    regions = []
+
+    # Skip the first map header
+    data_start = read_map_first_head(self, data)
+    if data_start is None:
+        return regions
+
+    try:
+        while True:
+            # Read header information
+            read_head_temp = read_head(self, data, data_start)
+            if read_head_temp is None:
+                log.debug("! Failed to read header")
+                break
+            mesh_obj_number, mesh_matrices_number, mesh_byte_size = read_head_temp
+
+            # Same block size rule as read_vertices
+            if mesh_matrices_number == 0 or int(mesh_byte_size / mesh_matrices_number) != 52:
+                log.debug("! Unexpected block size at %s", hex(data_start))
+                break
+
+            # Vertex and face region offsets
+            vertices_offset = data_start + 0x1D
+            faces_size_offset = vertices_offset + mesh_byte_size
+            if faces_size_offset + 4 > len(data):
+                log.debug("! Vertex region exceeds data at %s", hex(data_start))
+                break
+            faces_data_size = struct.unpack_from("<I", data, faces_size_offset)[0]
+            if faces_data_size >= len(data):
+                log.debug("! Unknown block at %s", hex(faces_size_offset))
+                break
+
+            regions.append(
+                {
+                    "mesh_obj_number": mesh_obj_number,
+                    "mesh_matrices_number": mesh_matrices_number,
+                    "mesh_byte_size": mesh_byte_size,
+                    "vertices_offset": vertices_offset,
+                    "faces_offset": faces_size_offset + 4,
+                    "faces_size": faces_data_size,
+                }
+            )
+
+            # Skip shaders, textures, animation etc. -> next object header
+            data_start = faces_size_offset + 4 + faces_data_size
+            find_start = find_next_head(data, data_start)
+            # Shader/texture region ends at the next header
+            regions[-1]["material_end"] = len(data) if find_start is None else find_start
+            if find_start is None:
+                break
+            data_start = find_start
+
+            # Check if end of file reached
+            if len(regions) >= regions[0]["mesh_obj_number"] - 1:
+                break
+    except Exception as e:
+        log.debug("! Failed to locate map objects: %s", e)
+        traceback.print_exc()
+
+    log.debug("<<< Located %s objects", len(regions))
+    return regions
+
+
+# Decode a single located object
+def decode_object(data, region):
+    """Decode the vertex, face, UV and normal arrays of one object"""
+    try:
+        mesh_byte_size = region["mesh_byte_size"]
+        mesh_matrices_number = region["mesh_matrices_number"]
+        vertices_offset = region["vertices_offset"]
+        faces_offset = region["faces_offset"]
+
+        # Zero-copy views into the file buffer
+        vertices_data = data[vertices_offset: vertices_offset + mesh_byte_size]
+        faces_data_block = data[faces_offset: faces_offset + region["faces_size"]]
+
+        vertices, normals, uvs = tools.decode_vertex_block(
+            vertices_data, mesh_matrices_number, 52, 52 - 0x10
+        )
+        faces = tools.decode_faces(faces_data_block, len(faces_data_block))
+        misaligned, trailing = tools.check_face_block(faces_data_block, len(faces_data_block))
+        if misaligned or trailing:
+            log.debug(
+                "! Face block at %s: %s misaligned records, %s trailing bytes",
+                hex(faces_offset), misaligned, trailing,
+            )
+        material = tools.parse_material_block(
+            data[faces_offset + region["faces_size"]: region["material_end"]]
+        )
+    except Exception as e:
+        log.debug("! Failed to decode object at %s: %s", hex(region["vertices_offset"]), e)
+        return None
+
+    return tools.SubMesh(
+        vertices,
+        faces,
+        normals,
+        uvs,
+        mesh_obj_number=region["mesh_obj_number"],
+        mesh_matrices_number=mesh_matrices_number,
+        mesh_byte_size=mesh_byte_size,
+        faces_size=region["faces_size"],
+        hash=tools.content_hash(("map", 52, 52 - 0x10), vertices_data, faces_data_block),
+        material=material,
+    )
+
+
+# Decode located objects across a thread pool
+def iter_decode_objects(data, regions, workers=0, window=0):
+    """Decode objects in parallel, yielding them in order (None for failures)
+
+    At most window objects (twice the workers by default) are decoded ahead
+    of the consumer, so a slow consumer bounds memory instead of the whole
+    file being decoded up front.
+    """
+    # NumPy releases the GIL while copying and converting, so threads scale
+    # and the decoded arrays are shared with the caller without pickling
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    view = memoryview(data)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for region in regions:
+            pending.append(pool.submit(decode_object, view, region))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Drop queued work when the consumer stops early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_objects(data, regions, workers=0):
+    """Decode objects in parallel, returning None for failed objects"""
+    return list(iter_decode_objects(data, regions, workers))
+
+
+# Split mesh data across a thread pool
+def split_mesh_parallel(self, data, workers=0):
+    """Split mesh data, decoding all objects in parallel"""
+    log.debug(">>> Begin parallel splitting of mesh data")
+    # Find every object first so the regions can be decoded independently
+    regions = locate_objects(self, data)
+    if not regions:
+        return []
+
+    decoded = decode_objects(data, regions, workers)
+
+    # Stop at the first failure, like split_mesh does
+    mesh_obj = []
+    for this_obj in decoded:
+        if this_obj is None:
+            log.debug("! Failed to decode object, stopping")
+            break
+        mesh_obj.append(this_obj)
+
+    log.debug("<<< Decoded %s objects", len(mesh_obj))
+    return mesh_obj
+
+
+# Per-object bounding boxes
+def compute_bounds(data, regions):
+    """Compute the (N, 2, 3) min/max corners of every object from positions only
+
+    Non-finite positions are ignored; objects without finite positions keep
+    zero bounds.
+    """
+    bounds = np.zeros((len(regions), 2, 3), dtype=np.float32)
+    for i, region in enumerate(regions):
+        try:
+            positions = tools.strided_view(
+                data, "<f4", region["mesh_matrices_number"], 52, region["vertices_offset"], 3
+            )
+        except (TypeError, ValueError):
+            log.debug("! Vertex region out of range at %s", hex(region["vertices_offset"]))
+            continue
+        positions = positions[np.isfinite(positions).all(axis=1)]
+        if len(positions):
+            bounds[i, 0] = positions.min(axis=0)
+            bounds[i, 1] = positions.max(axis=0)
+    return bounds
+
+
+class BoundsGrid:
+    """Uniform grid over object bounding boxes"""
+
+    # Objects spanning more cells than this are kept out of the grid
+    MAX_CELLS = 512
+
+    def __init__(self, bounds, cell_size=0.0):
+        self.bounds = bounds
+        # Objects with NaN or infinite corners can never be hit
+        finite = np.isfinite(bounds).all(axis=(1, 2)) if len(bounds) else np.zeros(0, dtype=bool)
+
+        # Default cell size: the median object extent
+        if cell_size <= 0:
+            extents = (bounds[finite, 1] - bounds[finite, 0]).max(axis=1)
+            cell_size = float(np.median(extents)) if len(extents) else 1.0
+        self.cell_size = max(cell_size, 1e-3)
+
+        # Cell -> object indices, and objects too large for the grid
+        self.cells = {}
+        self.oversized = []
+        with np.errstate(invalid="ignore", over="ignore"):
+            cell_min = np.floor(bounds[:, 0].astype(np.float64) / self.cell_size)
+            cell_max = np.floor(bounds[:, 1].astype(np.float64) / self.cell_size)
+            # Far-out coordinates would not fit the integer cell keys either
+            huge = (np.prod(cell_max - cell_min + 1, axis=1) > self.MAX_CELLS) | (
+                np.abs(bounds).max(axis=(1, 2)) / self.cell_size > 2**52
+            )
+        for i in np.flatnonzero(finite):
+            if huge[i]:
+                self.oversized.append(int(i))
+                continue
+            for key in self._cell_range(cell_min[i].astype(np.int64), cell_max[i].astype(np.int64)):
+                self.cells.setdefault(key, []).append(int(i))
+        if not finite.all():
+            log.debug("! Left %s objects with non-finite bounds out of the grid", int((~finite).sum()))
+
+    @staticmethod
+    def _cell_range(cell_min, cell_max):
+        for x in range(cell_min[0], cell_max[0] + 1):
+            for y in range(cell_min[1], cell_max[1] + 1):
+                for z in range(cell_min[2], cell_max[2] + 1):
+                    yield x, y, z
+
+    def query(self, box_min, box_max):
+        """Return sorted indices of objects intersecting the box"""
+        box_min = np.asarray(box_min, dtype=np.float32)
+        box_max = np.asarray(box_max, dtype=np.float32)
+        cell_min = np.floor(box_min.astype(np.float64) / self.cell_size)
+        cell_max = np.floor(box_max.astype(np.float64) / self.cell_size)
+
+        # Gather candidates, visiting only occupied cells for huge boxes
+        candidates = set(self.oversized)
+        cell_count = float(np.prod(np.maximum(cell_max - cell_min + 1, 0)))
+        if cell_count > len(self.cells):
+            for key, indices in self.cells.items():
+                if all(cell_min[a] <= key[a] <= cell_max[a] for a in range(3)):
+                    candidates.update(indices)
+        else:
+            for key in self._cell_range(cell_min.astype(np.int64), cell_max.astype(np.int64)):
+                candidates.update(self.cells.get(key, ()))
+        if not candidates:
+            return []
+
+        # Exact box test on the candidates
+        candidates = np.fromiter(sorted(candidates), dtype=np.int64)
+        bounds = self.bounds[candidates]
+        hit = np.all((bounds[:, 0] <= box_max) & (bounds[:, 1] >= box_min), axis=1)
+        return candidates[hit].tolist()
+
+
+# Spatial index per map file
+_map_index_cache = {}
+
+
+def get_map_index(self, file_path, data=None):
+    """Return the cached object regions, bounds and grid of a map file"""
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _map_index_cache.get(file_path)
+    if cached is not None and cached["key"] == key:
+        log.debug("> Using cached map index: %s", file_path)
+        return cached
+
+    if data is None:
+        with open(file_path, "rb") as file:
+            data = file.read()
+
+    regions = locate_objects(self, data)
+    bounds = compute_bounds(data, regions)
+    cached = {
+        "key": key,
+        "regions": regions,
+        "bounds": bounds,
+        "grid": BoundsGrid(bounds),
+    }
+    _map_index_cache[file_path] = cached
+    log.debug("<<< Indexed %s map objects", len(regions))
+    return cached
+
+
+def world_to_map(co):
+    """Convert a world position to map space (objects are rotated 90 degrees on X)"""
+    x, y, z = co
+    return x, z, -y
+
+
+def map_to_world(co):
+    """Convert a map space position to world space"""
+    x, y, z = co
+    return x, -z, y
+
+
+# Concatenate decoded objects into one
+def merge_objects(items):
+    """Merge (index, object) pairs into one object with per-vertex submesh ids
+
+    materials lists the unique material descriptors by slot; objects without
+    a material share one None entry, an empty slot of their own.
+    """
+    vertices = []
+    faces = []
+    normals = []
+    uvs = []
+    submesh_ids = []
+    # Unique materials, their slots by hash, and the material slot of every face
+    materials = []
+    slots = {}
+    face_materials = []
+
+    # Faces are shifted by the number of vertices merged before them
+    offset = 0
+    for idx, this_obj in items:
+        obj_vertices = this_obj.vertices
+        obj_faces = this_obj.faces
+        vertices.append(obj_vertices)
+        faces.append(obj_faces + offset)
+        normals.append(this_obj.normals)
+        uvs.append(this_obj.uvs)
+        submesh_ids.append(np.full(len(obj_vertices), idx, dtype=np.int32))
+        offset += len(obj_vertices)
+
+        material = this_obj.material
+        key = None if material is None else material["hash"]
+        if key not in slots:
+            slots[key] = len(materials)
+            materials.append(material)
+        slot = slots[key]
+        face_materials.append(np.full(len(obj_faces), slot, dtype=np.int32))
+
+    merged_vertices = np.concatenate(vertices) if vertices else np.zeros((0, 3), np.float32)
+    merged_faces = np.concatenate(faces) if faces else np.zeros((0, 3), np.uint32)
+    return tools.SubMesh(
+        merged_vertices,
+        merged_faces,
+        np.concatenate(normals) if normals else np.zeros((0, 3), np.float32),
+        np.concatenate(uvs) if uvs else np.zeros((0, 2), np.float32),
+        mesh_obj_number=len(items),
+        mesh_matrices_number=len(merged_vertices),
+        mesh_byte_size=len(merged_vertices) * 52,
+        faces_size=len(merged_faces) * 12,
+        submesh_ids=np.concatenate(submesh_ids) if submesh_ids else np.zeros(0, np.int32),
+        materials=materials,
+        face_materials=(
+            np.concatenate(face_materials) if face_materials else np.zeros(0, np.int32)
+        ),
+    )
+
+
+# Group decoded objects by grid cell
+def group_by_cell(items, cell_size):
+    """Group (index, object) pairs by the grid cell holding their bounds center
+
+    Non-finite positions are left out of the bounds; objects without finite
+    positions go to the cell at the origin.
+    """
+    cells = {}
+    for idx, this_obj in items:
+        obj_vertices = this_obj.vertices
+        obj_vertices = obj_vertices[np.isfinite(obj_vertices).all(axis=1)]
+        if len(obj_vertices):
+            center = (obj_vertices.min(axis=0) + obj_vertices.max(axis=0)) / 2
+        else:
+            center = np.zeros(3, dtype=np.float32)
+        key = tuple(int(c) for c in np.floor(center / cell_size))
+        cells.setdefault(key, []).append((idx, this_obj))
+    return cells
+
+
+# Object count announced by the first header
+def count_objects(data, start_index=24):
+    """Return the number of objects the first header announces"""
+    if len(data) < start_index + 4:
+        return 0
+    return max(struct.unpack_from("<I", data, start_index)[0] - 1, 1)
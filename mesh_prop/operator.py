@@ -1,15 +1,17 @@
 # mesh_prop\operator.py
-import math
 import os
 import traceback
 
 import bpy
 
 from . import utils
+from ..background import BackgroundImportMixin
+from ..cache import CachedImportMixin
+from ..builder import build_mesh_object, tag_object
 
 
 # Operator definition
-class ImportMeshPropClass(bpy.types.Operator):
+class ImportMeshPropClass(CachedImportMixin, BackgroundImportMixin, bpy.types.Operator):
     """Import a .mesh file"""
 
     bl_idname = "import.mesh_prop"
@@ -20,6 +22,58 @@ class ImportMeshPropClass(bpy.types.Operator):
     # Extension filter
     filename_ext = ".mesh"
     filter_glob: bpy.props.StringProperty(default="*.mesh", options={"HIDDEN"})  # type: ignore
+    # Share meshes between identical objects
+    instance_duplicates: bpy.props.BoolProperty(
+        name="Instance Duplicates",
+        description="Objects with byte-identical data share one mesh, also across imports",
+        default=True,
+    )  # type: ignore
+    # Weld seam-split vertices
+    weld_vertices: bpy.props.BoolProperty(
+        name="Weld Vertices",
+        description="Merge coincident vertices before building, keeping UVs and normals per face corner",
+        default=False,
+    )  # type: ignore
+    # Weld distance
+    weld_distance: bpy.props.FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this are merged",
+        default=1e-5,
+        min=1e-7,
+        precision=6,
+    )  # type: ignore
+    # Import in the background
+    background: bpy.props.BoolProperty(
+        name="Background Import",
+        description="Parse on a worker thread and add objects gradually (Esc to cancel)",
+        default=False,
+    )  # type: ignore
+
+    @staticmethod
+    def plan_items(reporter, data, mesh_name):
+        """Return (count, items) to build; does not touch bpy"""
+        # Split mesh data one object at a time
+        items = (
+            {"name": f"{mesh_name}_{idx}", "index": idx, "data": this_obj}
+            for idx, this_obj in enumerate(utils.iter_mesh(reporter, data))
+        )
+        return utils.count_objects(data), items
+
+    def build_item(self, context, item):
+        """Build one planned item, returning the created objects"""
+        new_obj = build_mesh_object(
+            context,
+            item["name"],
+            item["data"],
+            self.instance_duplicates,
+            self.weld_amount(),
+        )
+        tag_object(new_obj, self.filepath, item["index"])
+        return [new_obj]
+
+    def weld_amount(self):
+        """Weld distance, or 0 when welding is off"""
+        return self.weld_distance if self.weld_vertices else 0.0
 
     # Display file selector
     def invoke(self, context, event):
@@ -48,67 +102,22 @@ class ImportMeshPropClass(bpy.types.Operator):
             # File name without extension
             mesh_name = os.path.splitext(os.path.basename(file_path))[0]
 
-            # Split mesh data
-            mesh_obj = utils.split_mesh(self, data)
-
-            # Loop index
-            idx = 0
-            # Read data blocks
-            for this_obj in mesh_obj:
-                # Vertex data
-                vertices = this_obj["vertices"]["data"]
-                # Face data
-                faces = this_obj["faces"]["data"]
-                # Normal data
-                normals = this_obj["normals"]
-                # UV coordinates
-                uvs = this_obj["uvs"]
-
-                # Create new mesh
-                new_mesh = bpy.data.meshes.new(f"{mesh_name}_{idx}")
-                new_obj = bpy.data.objects.new(f"{mesh_name}_{idx}", new_mesh)
-
-                # Link object to scene
-                context.collection.objects.link(new_obj)
-
-                # Create vertices and faces
-                new_mesh.from_pydata(vertices, [], faces)
-
-                # Create UV layer
-                uv_layer = new_mesh.uv_layers.new(name="UVMap")
-
-                # Set UV for each loop
-                for face in new_mesh.polygons:
-                    for loop_idx in face.loop_indices:
-                        # Vertex index
-                        vertex_idx = new_mesh.loops[loop_idx].vertex_index
-                        # Set UV
-                        uv_layer.data[loop_idx].uv = uvs[vertex_idx]
-
-                # Enable smooth shading
-                new_mesh.shade_smooth()
-
-                # Prepare normals
-                loop_normals = []
-                for poly in new_mesh.polygons:
-                    for vertex_idx in poly.vertices:
-                        loop_normals.append(normals[vertex_idx])
-
-                # Set custom normals
-                new_mesh.normals_split_custom_set(loop_normals)
-
-                # Update mesh
-                new_mesh.update()
-
-                # Set object location
-                new_obj.location = (0, 0, 0)
-                # Use Euler rotation mode
-                new_obj.rotation_mode = "XYZ"
-                # Rotate X by 90 degrees (radians)
-                new_obj.rotation_euler = (math.radians(90), 0, 0)
-
-                # Increment index
-                idx += 1
+            # Reuse the snapshot of an identical earlier import
+            if self.use_cache and self.load_from_cache(context, data) is not None:
+                self.report({"INFO"}, "Model loaded from cache")
+                return {"FINISHED"}
+
+            if self.background:
+                return self.start_background(
+                    context, mesh_name, lambda reporter: self.plan_items(reporter, data, mesh_name)
+                )
+
+            # Build while the next objects are decoded
+            objects = self.build_pipelined(
+                context, lambda reporter: self.plan_items(reporter, data, mesh_name)
+            )
+            if self.use_cache:
+                self.save_to_cache(objects)
 
             self.report({"INFO"}, "Model loaded successfully")
             return {"FINISHED"}
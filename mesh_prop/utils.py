@@ -46,12 +46,6 @@ def read_head(self, data, start_index):
 def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
     """Parse vertex data"""
     log.debug(">>> Begin parsing vertex data")
-    # Vertex array
-    vertices = []
-    # Normal array
-    normals = []
-    # UV coordinate array
-    uvs = []
 
     # Size of each data block (0x34)
     block_size = int(mesh_byte_size / mesh_matrices_number)
@@ -65,35 +59,10 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 
     # 解析顶点数据
     try:
-        for mni in range(mesh_matrices_number):
-            # Calculate start of current block
-            mniv = block_size * mni
-            # Ensure there are enough bytes to unpack
-            if mniv + block_size <= mesh_byte_size:
-                vx = struct.unpack_from("f", vertices_data, mniv)[0]
-                vy = struct.unpack_from("f", vertices_data, mniv + 4)[0]
-                vz = struct.unpack_from("f", vertices_data, mniv + 8)[0]
-                # Append vertex to list
-                vertices.append((vx, vy, vz))
-
-                # Read normal data
-                nx = tools.read_half_float(vertices_data, mniv + 0x0c)
-                ny = tools.read_half_float(vertices_data, mniv + 0x0e)
-                nz = tools.read_half_float(vertices_data, mniv + 0x10)
-                normals.append((nx, ny, nz))
-                # log.debug(">> Read normal data: %s , %s , %s", nx, ny, nz)
-
-                # Read UV coordinates
-                # TODO: verify UV mapping (possible bug)
-                uv_start = mniv + block_size - 0xc
-                # log.debug(">> uv_start: %s , mniv : %s ", uv_start, mniv)
-                u = tools.read_half_float(vertices_data, uv_start)
-                v = tools.read_half_float(vertices_data, uv_start + 0x2)
-                uvs.append((u, 1 - v))
-                log.debug(">> Read UV coordinates: %s , %s ", u, 1 - v)
-            else:
-                log.debug("! Vertex data parse failed: insufficient bytes at offset %s", mniv)
-                break
+        # Decode every record of the block at once
+        vertices, normals, uvs = tools.decode_vertex_block(
+            vertices_data, mesh_matrices_number, block_size, block_size - 0xc
+        )
     except Exception as e:
         log.debug("! Vertex data parse failed: %s", e)
         self.report({"ERROR"}, f"Vertex data parse failed: {e}")
@@ -109,37 +78,42 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 def read_faces(self, faces_data_block, index_length):
     """Parse face data"""
     log.debug(">>> Begin parsing face data %s", index_length)
-    faces = []
     try:
-        # Ensure there are enough bytes to unpack
-        for i in range(0, index_length, 12):
-            f0 = struct.unpack_from("H", faces_data_block, i)[0]
-            f1 = struct.unpack_from("H", faces_data_block, i + 4)[0]
-            f2 = struct.unpack_from("H", faces_data_block, i + 8)[0]
-            faces.append((f0, f1, f2))
-            # log.debug("> Parsing face: %s -> %s %s %s", i, f0, f1, f2)
+        # Decode every 12-byte record at once
+        faces = tools.decode_faces(faces_data_block, index_length)
     except Exception as e:
         log.debug("! Face data parse failed: %s", e)
         self.report({"ERROR"}, f"Face data parse failed: {e}")
         traceback.print_exc()
         return {"CANCELLED"}
 
+    # Non-zero upper index halves mean the block was read at the wrong stride
+    misaligned, trailing = tools.check_face_block(faces_data_block, index_length)
+    if misaligned or trailing:
+        log.debug("! Face block: %s misaligned records, %s trailing bytes", misaligned, trailing)
+        self.report(
+            {"WARNING"},
+            f"Face data looks misaligned: {misaligned} records, {trailing} trailing bytes",
+        )
+
     log.debug("<<< Finished reading %s faces", hex(len(faces)))
 
     return faces
 
 
 # Split mesh data
-def split_mesh(self, data):
-    """Split mesh data"""
+def iter_mesh(self, data):
+    """Split mesh data, yielding each object as soon as it is decoded"""
     log.debug(">>> Begin splitting mesh data")
 
     # Data start offset
     data_start = 0
     # Is this the first read
     first_read = True
-    # Mesh objects
-    mesh_obj = []
+    # Objects yielded so far
+    obj_count = 0
+    # Object count from the first header
+    first_obj_number = None
 
     try:
         while True:
@@ -154,6 +128,8 @@ def split_mesh(self, data):
                 mesh_matrices_number,
                 mesh_byte_size,
             ) = read_head(self, data, data_start)
+            if first_obj_number is None:
+                first_obj_number = mesh_obj_number
 
             # Get vertex data length
             vertices_data = data[data_start + 0x1D: data_start + 0x1D + mesh_byte_size]
@@ -162,12 +138,13 @@ def split_mesh(self, data):
                 log.debug("! Failed to get vertex data length")
                 self.report({"ERROR"}, "Failed to get vertex data length")
                 traceback.print_exc()
-                return {"CANCELLED"}
+                return
 
             # 解析顶点数据块
             vertices_array, normals, uvs = read_vertices(
                 self, vertices_data, mesh_matrices_number, mesh_byte_size
             )
+            block_size = int(mesh_byte_size / mesh_matrices_number)
 
             # 获取面数据块大小
             faces_data_size = struct.unpack(
@@ -198,33 +175,46 @@ def split_mesh(self, data):
             # 解析面数据块
             faces_array = read_faces(self, faces_data_block, len(faces_data_block))
 
-            # Append data to mesh_obj
-            mesh_obj.append(
-                {
-                    "vertices": {
-                        "mesh_obj_number": mesh_obj_number,
-                        "mesh_matrices_number": mesh_matrices_number,
-                        "mesh_byte_size": mesh_byte_size,
-                        "data": vertices_array,
-                    },
-                    "faces": {"size": faces_data_size, "data": faces_array},
-                    "uvs": uvs,
-                    "normals": normals,
-                }
+            # Hand the decoded object to the caller
+            yield tools.SubMesh(
+                vertices_array,
+                faces_array,
+                normals,
+                uvs,
+                mesh_obj_number=mesh_obj_number,
+                mesh_matrices_number=mesh_matrices_number,
+                mesh_byte_size=mesh_byte_size,
+                faces_size=faces_data_size,
+                index=obj_count,
+                hash=tools.content_hash(
+                    ("prop", block_size, block_size - 0xc), vertices_data, faces_data_block
+                ),
             )
+            obj_count += 1
 
             # End position, also the new start
             data_start += 0x1D + mesh_byte_size + 4 + faces_data_size
             log.debug("> data_start: %s", hex(data_start))
 
             # Check if end of file reached
-            if len(mesh_obj) >= mesh_obj[0]["vertices"]["mesh_obj_number"] - 1:
+            if obj_count >= first_obj_number - 1:
                 log.debug("<<< Reached end of data")
                 break
-
-        return mesh_obj
     except Exception as e:
         log.debug("! Failed to split mesh data: %s", e)
         self.report({"ERROR"}, f"Failed to split mesh data: {e}")
         traceback.print_exc()
-        return {"CANCELLED"}
+
+
+# Split mesh data
+def split_mesh(self, data):
+    """Split mesh data"""
+    return list(iter_mesh(self, data))
+
+
+# Object count announced by the first header
+def count_objects(data, start_index=24):
+    """Return the number of objects the first header announces"""
+    if len(data) < start_index + 4:
+        return 0
+    return max(struct.unpack_from("<I", data, start_index)[0] - 1, 1)
@@ -1,16 +1,31 @@
 # mesh_wcm\operator.py
-import math
+import fnmatch
 import os
 import traceback
 
 import bpy
 
 from . import utils
+from ..background import BackgroundImportMixin
+from ..cache import CachedImportMixin
+from ..builder import build_mesh_object, tag_object
+from ..catalog import utils as catalog_utils
 from ..log import log
 
 
+# Submesh found in the file
+class WCMObjectItem(bpy.types.PropertyGroup):
+    """Object listed in the import dialog"""
+
+    # Import this object
+    selected: bpy.props.BoolProperty(name="Import", default=True)  # type: ignore
+    # Sizes shown next to the name
+    vertex_count: bpy.props.IntProperty()  # type: ignore
+    face_count: bpy.props.IntProperty()  # type: ignore
+
+
 # Operator definition
-class ImportMeshWCMClass(bpy.types.Operator):
+class ImportMeshWCMClass(CachedImportMixin, BackgroundImportMixin, bpy.types.Operator):
     """Import a .mesh file"""
 
     bl_idname = "import.wcm_mesh"
@@ -21,6 +36,87 @@ class ImportMeshWCMClass(bpy.types.Operator):
     # Extension filter
     filename_ext = ".mesh"
     filter_glob: bpy.props.StringProperty(default="*.mesh", options={"HIDDEN"})  # type: ignore
+    # Share meshes between identical objects
+    instance_duplicates: bpy.props.BoolProperty(
+        name="Instance Duplicates",
+        description="Objects with byte-identical data share one mesh, also across imports",
+        default=True,
+    )  # type: ignore
+    # Weld seam-split vertices
+    weld_vertices: bpy.props.BoolProperty(
+        name="Weld Vertices",
+        description="Merge coincident vertices before building, keeping UVs and normals per face corner",
+        default=False,
+    )  # type: ignore
+    # Weld distance
+    weld_distance: bpy.props.FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this are merged",
+        default=1e-5,
+        min=1e-7,
+        precision=6,
+    )  # type: ignore
+    # Create vertex groups from the skin data
+    import_skin: bpy.props.BoolProperty(
+        name="Import Skin Weights",
+        description="Create a vertex group per bone from the bone indices and weights of the vertices",
+        default=True,
+    )  # type: ignore
+    # Import in the background
+    background: bpy.props.BoolProperty(
+        name="Background Import",
+        description="Parse on a worker thread and add objects gradually (Esc to cancel)",
+        default=False,
+    )  # type: ignore
+    # Object name filter
+    object_filter: bpy.props.StringProperty(
+        name="Object Filter",
+        description="Glob patterns of objects to import, separated by commas",
+        default="*",
+    )  # type: ignore
+    # Submeshes of the selected file
+    object_items: bpy.props.CollectionProperty(type=WCMObjectItem)  # type: ignore
+    # File the submeshes were listed from
+    listed_path: bpy.props.StringProperty(options={"HIDDEN", "SKIP_SAVE"})  # type: ignore
+
+    @staticmethod
+    def plan_items(reporter, data, selected, mesh_name):
+        """Return (count, items) to build; does not touch bpy"""
+        # Split mesh data one object at a time
+        items = (
+            {"name": f"{mesh_name}_{mesh_item.index}", "index": mesh_item.index, "data": mesh_item}
+            for mesh_item in utils.iter_mesh(reporter, data, selected)
+        )
+        return len(selected), items
+
+    @staticmethod
+    def locate_submeshes(reporter, data):
+        """Return the submesh blocks found by walking the headers, or None
+
+        The name table at the start of the file holds the bone names, not
+        one entry per submesh.
+        """
+        read_head_temp = utils.read_dynamic_head(reporter, data)
+        if not isinstance(read_head_temp, tuple):
+            return None
+        return catalog_utils.locate_wcm(data)
+
+    def build_item(self, context, item):
+        """Build one planned item, returning the created objects"""
+        new_obj = build_mesh_object(
+            context,
+            item["name"],
+            item["data"],
+            self.instance_duplicates,
+            self.weld_amount(),
+            self.import_skin,
+        )
+        tag_object(new_obj, self.filepath, item["index"])
+        return [new_obj]
+
+    def weld_amount(self):
+        """Weld distance, or 0 when welding is off"""
+        return self.weld_distance if self.weld_vertices else 0.0
 
     # Display file selector
     def invoke(self, context, event):
@@ -28,6 +124,66 @@ class ImportMeshWCMClass(bpy.types.Operator):
         context.window_manager.fileselect_add(self)
         return {"RUNNING_MODAL"}
 
+    # Refresh the submesh list when another file is selected
+    def check(self, context):
+        if self.filepath == self.listed_path:
+            return False
+        self.listed_path = self.filepath
+        self.object_items.clear()
+
+        if os.path.isfile(self.filepath):
+            mesh_name = os.path.splitext(os.path.basename(self.filepath))[0]
+            try:
+                with open(self.filepath, "rb") as file:
+                    data = file.read()
+                for block in self.locate_submeshes(catalog_utils.QuietReporter(), data) or ():
+                    item = self.object_items.add()
+                    item.name = f"{mesh_name}_{block['index']}"
+                    item.vertex_count = block["vertex_count"]
+                    item.face_count = block["face_count"]
+            except Exception as e:
+                log.debug("! Failed to list submeshes: %s", e)
+        return True
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "background")
+        layout.prop(self, "use_cache")
+        row = layout.row()
+        row.enabled = self.use_cache
+        row.prop(self, "link_cached")
+        layout.prop(self, "instance_duplicates")
+        layout.prop(self, "import_skin")
+        layout.prop(self, "weld_vertices")
+        row = layout.row()
+        row.enabled = self.weld_vertices
+        row.prop(self, "weld_distance")
+        layout.prop(self, "object_filter")
+        if self.object_items:
+            box = layout.box()
+            box.label(text="Objects")
+            for item in self.object_items:
+                box.prop(
+                    item,
+                    "selected",
+                    text=f"{item.name} ({item.vertex_count} vertices, {item.face_count} faces)",
+                )
+
+    def selected_objects(self, blocks, mesh_name):
+        """Return indices of objects that pass the checkboxes and the filter"""
+        patterns = [p.strip() for p in self.object_filter.split(",") if p.strip()]
+        selected = set()
+        for i, block in enumerate(blocks):
+            # Checkboxes only apply when they were built for this file
+            if self.listed_path == self.filepath and i < len(self.object_items):
+                if not self.object_items[i].selected:
+                    continue
+            obj_name = f"{mesh_name}_{block['index']}"
+            if patterns and not any(fnmatch.fnmatchcase(obj_name, p) for p in patterns):
+                continue
+            selected.add(block["index"])
+        return selected
+
     def execute(self, context):
         # Remove all objects from the scene
         # bpy.ops.object.select_all(action="SELECT")
@@ -50,71 +206,32 @@ class ImportMeshWCMClass(bpy.types.Operator):
             mesh_name = os.path.splitext(os.path.basename(file_path))[0]
             log.debug("<<< Model name: %s", mesh_name)
 
-            # Split mesh data
-            mesh_obj = utils.split_mesh(self, data)
-
-            # Loop index
-            idx = 0
-            # Read data blocks
-            for mesh_item in mesh_obj:
-                # Object name
-                obj_name = mesh_item["name"]
-                # Vertex data
-                vertices = mesh_item["vertices"]["data"]
-                # Face data
-                faces = mesh_item["faces"]["data"]
-                # Normal data
-                normals = mesh_item["normals"]
-                # UV coordinates
-                uvs = mesh_item["uvs"]
-
-                # Create new mesh
-                new_mesh = bpy.data.meshes.new(f"{obj_name}_{idx}")
-                new_obj = bpy.data.objects.new(
-                    f"{obj_name}_{idx}", new_mesh
+            # Objects chosen in the dialog
+            blocks = self.locate_submeshes(self, data)
+            if blocks is None:
+                # The header reader has reported the error
+                return {"CANCELLED"}
+            selected = self.selected_objects(blocks, mesh_name)
+            log.debug("<<< Importing %s of %s objects", len(selected), len(blocks))
+
+            # Reuse the snapshot of an identical earlier import
+            if self.use_cache and self.load_from_cache(context, data, sorted(selected)) is not None:
+                self.report({"INFO"}, "Model loaded from cache")
+                return {"FINISHED"}
+
+            if self.background:
+                return self.start_background(
+                    context,
+                    mesh_name,
+                    lambda reporter: self.plan_items(reporter, data, selected, mesh_name),
                 )
 
-                # Link object to scene
-                context.collection.objects.link(new_obj)
-
-                # Create vertices and faces
-                new_mesh.from_pydata(vertices, [], faces)
-
-                # Create UV layer
-                uv_layer = new_mesh.uv_layers.new(name="UVMap")
-
-                # Set UV for each loop
-                for face in new_mesh.polygons:
-                    for loop_idx in face.loop_indices:
-                        # Vertex index
-                        vertex_idx = new_mesh.loops[loop_idx].vertex_index
-                        # Set UV
-                        uv_layer.data[loop_idx].uv = uvs[vertex_idx]
-
-                # Enable smooth shading
-                new_mesh.shade_smooth()
-
-                # Prepare normals
-                loop_normals = []
-                for poly in new_mesh.polygons:
-                    for vertex_idx in poly.vertices:
-                        loop_normals.append(normals[vertex_idx])
-
-                # Set custom normals
-                new_mesh.normals_split_custom_set(loop_normals)
-
-                # Update mesh
-                new_mesh.update()
-
-                # Set object location
-                new_obj.location = (0, 0, 0)
-                # Use Euler rotation mode
-                new_obj.rotation_mode = "XYZ"
-                # Rotate X by 90 degrees (radians)
-                new_obj.rotation_euler = (math.radians(90), 0, 0)
-
-                # Increment index
-                idx += 1
+            # Build while the next objects are decoded
+            objects = self.build_pipelined(
+                context, lambda reporter: self.plan_items(reporter, data, selected, mesh_name)
+            )
+            if self.use_cache:
+                self.save_to_cache(objects)
 
             self.report({"INFO"}, "Model loaded successfully")
             return {"FINISHED"}
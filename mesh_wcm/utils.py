@@ -1,4 +1,5 @@
 # mesh_wcm\utils.py
+import itertools
 import struct
 import traceback
 
@@ -107,12 +108,6 @@ def read_head(data, start_index):
 def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
     """Parse vertex data"""
     log.debug(">>> Begin parsing vertex data")
-    # Vertex data
-    vertices = []
-    # Normal data
-    normals = []
-    # UV coordinate data
-    uvs = []
 
     # Size of each data block (0x34 is an estimate; may need adjustment)
     block_size = int(mesh_byte_size / mesh_matrices_number)
@@ -126,35 +121,10 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 
     # 解析顶点数据
     try:
-        for mni in range(mesh_matrices_number):
-            # Calculate current block start
-            mniv = block_size * mni
-            # Ensure there are enough bytes to unpack
-            if mniv + block_size <= mesh_byte_size:
-                vx = struct.unpack_from("f", vertices_data, mniv)[0]
-                vy = struct.unpack_from("f", vertices_data, mniv + 4)[0]
-                vz = struct.unpack_from("f", vertices_data, mniv + 8)[0]
-                # Append vertex to list
-                vertices.append((vx, vy, vz))
-
-                # Read normal data
-                nx = tools.read_half_float(vertices_data, mniv + 0x0c)
-                ny = tools.read_half_float(vertices_data, mniv + 0x0e)
-                nz = tools.read_half_float(vertices_data, mniv + 0x10)
-                normals.append((nx, ny, nz))
-                # log.debug(">> Read normal data: %s , %s , %s", nx, ny, nz)
-
-                # Read UV coordinates
-                uv_start = mniv + block_size - 8
-                # log.debug(">> uv_start: %s , mniv : %s ", uv_start, mniv)
-                u = tools.read_half_float(vertices_data, uv_start)
-                v = tools.read_half_float(vertices_data, uv_start + 0x2)
-                uvs.append((u, 1 - v))
-                # log.debug(">> Read UV coordinates: %s , %s ", u, 1 - v)
-
-            else:
-                log.debug("! Vertex data parse failed: insufficient bytes at offset %s", mniv)
-                break
+        # Decode every record of the block at once
+        vertices, normals, uvs = tools.decode_vertex_block(
+            vertices_data, mesh_matrices_number, block_size, block_size - 8
+        )
     except Exception as e:
         log.debug("! Vertex data parse failed: %s", e)
         # self.report({"ERROR"}, f"顶点数据解析失败 : {e}")
@@ -171,15 +141,9 @@ def read_vertices(self, vertices_data, mesh_matrices_number, mesh_byte_size):
 def read_faces(self, faces_data_block, index_length):
     """Parse face data"""
     log.debug(">>> Begin parsing face data %s", hex(index_length))
-    faces = []
     try:
-        # Ensure there are enough bytes to unpack
-        for i in range(0, index_length, 12):
-            f0 = struct.unpack_from("H", faces_data_block, i)[0]
-            f1 = struct.unpack_from("H", faces_data_block, i + 4)[0]
-            f2 = struct.unpack_from("H", faces_data_block, i + 8)[0]
-            faces.append((f0, f1, f2))
-            # log.debug("> Parsing face: %s -> %s %s %s", f0, f1, f2)
+        # Decode every 12-byte record at once
+        faces = tools.decode_faces(faces_data_block, index_length)
     except Exception as e:
         log.debug("! Face data parse failed: %s", e)
         # self.report({"ERROR"}, f"面数据解析失败 : {e}")
@@ -187,32 +151,45 @@ def read_faces(self, faces_data_block, index_length):
         # return {"CANCELLED"}
         return None
 
+    # Non-zero upper index halves mean the block was read at the wrong stride
+    misaligned, trailing = tools.check_face_block(faces_data_block, index_length)
+    if misaligned or trailing:
+        log.debug("! Face block: %s misaligned records, %s trailing bytes", misaligned, trailing)
+        self.report(
+            {"WARNING"},
+            f"Face data looks misaligned: {misaligned} records, {trailing} trailing bytes",
+        )
+
     log.debug("<<< Finished reading %s faces", hex(len(faces)))
 
     return faces
 
 
 # Split mesh data
-def split_mesh(self, data):
-    """Split mesh data"""
+def iter_mesh(self, data, selected=None):
+    """Split mesh data, yielding selected objects as soon as they are decoded"""
     log.debug(">>> Begin splitting mesh data")
 
     # Data start offset
     data_start = 0
     # Is this the first read
     # first_read = True
-    # Mesh objects
-    mesh_obj = []
-
-    # Read dynamic header
-    data_index, mesh_info = read_dynamic_head(self, data)
+    # Object count from the first header
+    first_obj_number = None
+
+    # Read dynamic header; its name table holds the bone names
+    read_head_temp = read_dynamic_head(self, data)
+    if not isinstance(read_head_temp, tuple):
+        return
+    data_index, mesh_info = read_head_temp
     # Adjust data start position
     data_start = data_index
     log.debug("> fix data start: %s", hex(data_start))
 
     try:
-        for mi_name in mesh_info:
-            log.debug(">>> Reading mesh info name: %s", mi_name)
+        # Submeshes follow one another until the count of the first header
+        for obj_index in itertools.count():
+            log.debug(">>> Reading submesh: %s", obj_index)
             # if first_read:
             #     data_start += 24
             #     first_read = False
@@ -232,95 +209,101 @@ def split_mesh(self, data):
                 mesh_matrices_number,
                 mesh_byte_size,
             ) = read_head_temp
-
-            # Get vertex data length
-            vertices_data = data[data_start + 0x1D: data_start + 0x1D + mesh_byte_size]
-            log.debug("> Vertex data length: %s", hex(len(vertices_data)))
-            if len(vertices_data) <= 0:
-                log.debug("! Failed to get vertex data length")
-                # self.report({"ERROR"}, "获取顶点数据长度失败")
-                # traceback.print_exc()
-                # return {"CANCELLED"}
-                break
-
-            # Parse vertex data block
-            read_vertices_temp = read_vertices(
-                self, vertices_data, mesh_matrices_number, mesh_byte_size
-            )
-            # Check for parse failure
-            if read_vertices_temp is None:
-                log.debug("! Failed to parse vertex data")
-                # return mesh_obj
-                break
-            # Vertex data, UV data, tangents
-            vertices_array, normals, uvs = read_vertices_temp
+            if first_obj_number is None:
+                first_obj_number = mesh_obj_number
 
             # Get face data block size
+            faces_size_offset = data_start + 0x1D + mesh_byte_size
             faces_data_size = struct.unpack(
-                "<I",
-                data[
-                data_start
-                + 0x1D
-                + mesh_byte_size: data_start
-                                  + 0x1D
-                                  + mesh_byte_size
-                                  + 4
-                ],
+                "<I", data[faces_size_offset: faces_size_offset + 4]
             )[0]
             log.debug("> Face block size: %s", hex(faces_data_size))
-            # Get face data block
-            faces_data_block = data[
-                               data_start
-                               + 0x1D
-                               + mesh_byte_size
-                               + 4: data_start
-                                    + 0x1D
-                                    + mesh_byte_size
-                                    + 4
-                                    + faces_data_size
-                               ]
-            log.debug("> Index address: %s", hex(data_start + 0x1d + mesh_byte_size + 4))
-            log.debug("> Face data block length: %s", hex(len(faces_data_block)))
-            # Parse face data block
-            faces_array = read_faces(self, faces_data_block, len(faces_data_block))
-            # Check for parse failure
-            if faces_array is None:
-                log.debug("! Failed to parse face data")
-                # return mesh_obj
-                break
 
-            # Append data to mesh_obj
-            mesh_obj.append(
-                {
-                    "name": str(mi_name),
-                    "vertices": {
-                        "mesh_obj_number": mesh_obj_number,
-                        "mesh_matrices_number": mesh_matrices_number,
-                        "mesh_byte_size": mesh_byte_size,
-                        "data": vertices_array,
-                    },
-                    "faces": {"size": faces_data_size, "data": faces_array},
-                    "normals": normals,
-                    "uvs": uvs,
-                }
-            )
+            if selected is None or obj_index in selected:
+                # Get vertex data length
+                vertices_data = data[data_start + 0x1D: data_start + 0x1D + mesh_byte_size]
+                log.debug("> Vertex data length: %s", hex(len(vertices_data)))
+                if len(vertices_data) <= 0:
+                    log.debug("! Failed to get vertex data length")
+                    # self.report({"ERROR"}, "获取顶点数据长度失败")
+                    # traceback.print_exc()
+                    # return {"CANCELLED"}
+                    break
+
+                # Parse vertex data block
+                read_vertices_temp = read_vertices(
+                    self, vertices_data, mesh_matrices_number, mesh_byte_size
+                )
+                # Check for parse failure
+                if read_vertices_temp is None:
+                    log.debug("! Failed to parse vertex data")
+                    # return mesh_obj
+                    break
+                # Vertex data, UV data, tangents
+                vertices_array, normals, uvs = read_vertices_temp
+                # Bone indices and weights, when the stride carries them
+                block_size = mesh_byte_size // mesh_matrices_number
+                skin = tools.decode_skin(vertices_data, mesh_matrices_number, block_size)
+
+                # Get face data block
+                faces_data_block = data[
+                                   faces_size_offset
+                                   + 4: faces_size_offset
+                                        + 4
+                                        + faces_data_size
+                                   ]
+                log.debug("> Index address: %s", hex(faces_size_offset + 4))
+                log.debug("> Face data block length: %s", hex(len(faces_data_block)))
+                # Parse face data block
+                faces_array = read_faces(self, faces_data_block, len(faces_data_block))
+                # Check for parse failure
+                if faces_array is None:
+                    log.debug("! Failed to parse face data")
+                    # return mesh_obj
+                    break
+
+                # Hand the decoded object to the caller
+                yield tools.SubMesh(
+                    vertices_array,
+                    faces_array,
+                    normals,
+                    uvs,
+                    mesh_obj_number=mesh_obj_number,
+                    mesh_matrices_number=mesh_matrices_number,
+                    mesh_byte_size=mesh_byte_size,
+                    faces_size=faces_data_size,
+                    index=obj_index,
+                    hash=tools.content_hash(
+                        ("wcm", block_size, block_size - 8), vertices_data, faces_data_block
+                    ),
+                    bone_indices=None if skin is None else skin[0],
+                    bone_weights=None if skin is None else skin[1],
+                    bone_names=[str(name) for name in mesh_info],
+                )
+            else:
+                # Hop over the object using the header sizes only
+                log.debug("> Skipping unselected object: %s", obj_index)
 
             # End position, also the new start
             data_start += 0x1D + mesh_byte_size + 4 + faces_data_size
             log.debug("> data_start: %s", hex(data_start))
 
             # Check if end of file reached
-            if len(mesh_obj) >= mesh_obj[0]["vertices"]["mesh_obj_number"] - 1:
+            if obj_index + 1 >= first_obj_number - 1:
                 log.debug("<<< Reached end of data")
                 break
-
-        return mesh_obj
     except Exception as e:
         log.debug("! Failed to split mesh data: %s", e)
         # self.report({"ERROR"}, f"分割网格数据失败: {e}")
         traceback.print_exc()
         # return {"CANCELLED"}
-        return mesh_obj
+
+
+# Split mesh data
+def split_mesh(self, data, selected=None):
+    """Split mesh data, skipping objects whose index is not in selected"""
+    return list(iter_mesh(self, data, selected))
+
 
 # def read_half_float(data, offset):
 #     try:
@@ -0,0 +1,153 @@
+# preview\operator.py
+import math
+import os
+
+import bpy
+import numpy as np
+
+from . import utils
+from .. import materials
+from ..builder import build_mesh_object, report_sanitation, tag_object
+from ..catalog import utils as catalog_utils
+from ..log import log
+from ..mesh_map import utils as map_utils
+
+
+def set_points(mesh, positions, indices):
+    """Replace the geometry of a mesh with loose vertices tagged by submesh"""
+    mesh.clear_geometry()
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.ravel())
+    attribute = mesh.attributes.get("submesh_id") or mesh.attributes.new("submesh_id", "INT", "POINT")
+    attribute.data.foreach_set("value", indices)
+    mesh.update()
+
+
+class ImportPreviewClass(bpy.types.Operator):
+    """Preview where the objects of a mesh file are, as vertex positions only"""
+
+    bl_idname = "import.pmt_preview"
+    bl_label = "Preview Mesh File"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH", default="")  # type: ignore
+    filter_glob: bpy.props.StringProperty(default="*.mesh", options={"HIDDEN"})  # type: ignore
+    # Share of vertices to keep
+    ratio: bpy.props.FloatProperty(
+        name="Sample Ratio",
+        description="Share of the vertices of every object to show",
+        default=1.0,
+        min=0.001,
+        max=1.0,
+        subtype="FACTOR",
+    )  # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        if not os.path.isfile(self.filepath):
+            self.report({"ERROR"}, "File does not exist. Check the path")
+            return {"CANCELLED"}
+
+        with open(self.filepath, "rb") as file:
+            data = file.read()
+        kind = catalog_utils.detect_kind(self.filepath, data)
+        if kind not in ("wcm", "prop", "map"):
+            self.report({"ERROR"}, "Not a mesh file")
+            return {"CANCELLED"}
+
+        # Headers only, then one strided read per vertex block
+        blocks = catalog_utils.locate_submeshes(kind, data)
+        positions, indices = utils.sample_positions(data, blocks, self.ratio)
+
+        mesh_name = os.path.splitext(os.path.basename(self.filepath))[0]
+        mesh = bpy.data.meshes.new(f"{mesh_name}_preview")
+        set_points(mesh, positions, indices)
+        obj = bpy.data.objects.new(f"{mesh_name}_preview", mesh)
+        context.collection.objects.link(obj)
+        # Same orientation as the full import
+        obj.rotation_mode = "XYZ"
+        obj.rotation_euler = (math.radians(90), 0, 0)
+        tag_object(obj, self.filepath)
+        obj["pmt_preview"] = kind
+
+        log.debug("<<< Preview of %s: %s points in %s blocks", mesh_name, len(positions), len(blocks))
+        self.report({"INFO"}, f"Previewing {len(positions)} points of {len(blocks)} objects")
+        return {"FINISHED"}
+
+
+class UpgradePreviewClass(bpy.types.Operator):
+    """Import the objects under the selected preview points as full meshes"""
+
+    bl_idname = "import.pmt_preview_upgrade"
+    bl_label = "Upgrade Preview Selection"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and "pmt_preview" in obj
+
+    def execute(self, context):
+        obj = context.active_object
+        file_path = obj["pmt_source"]
+        if not os.path.isfile(file_path):
+            self.report({"ERROR"}, f"Missing source file: {file_path}")
+            return {"CANCELLED"}
+        if obj.mode == "EDIT":
+            # Selection is only in the mesh after leaving edit mode
+            obj.update_from_editmode()
+
+        # Objects with at least one selected point
+        mesh = obj.data
+        count = len(mesh.vertices)
+        selected = np.zeros(count, dtype=bool)
+        mesh.vertices.foreach_get("select", selected)
+        indices = np.zeros(count, dtype=np.int32)
+        mesh.attributes["submesh_id"].data.foreach_get("value", indices)
+        wanted = np.unique(indices[selected]).tolist()
+        if not wanted:
+            self.report({"ERROR"}, "Select preview points in edit mode first")
+            return {"CANCELLED"}
+
+        with open(file_path, "rb") as file:
+            data = file.read()
+        kind = obj["pmt_preview"]
+        mesh_name = os.path.splitext(os.path.basename(file_path))[0]
+        if kind == "map":
+            # Decode only the located objects that were picked
+            regions = map_utils.locate_objects(self, data)
+            wanted = [idx for idx in wanted if idx < len(regions)]
+            decoded = dict(zip(wanted, map_utils.decode_objects(data, [regions[idx] for idx in wanted])))
+        else:
+            decoded = catalog_utils.decode_indexed(kind, data)
+
+        upgraded = []
+        for idx in wanted:
+            this_obj = decoded.get(idx)
+            if this_obj is None:
+                continue
+            new_obj = build_mesh_object(context, f"{this_obj.name or mesh_name}_{idx}", this_obj)
+            tag_object(new_obj, file_path, idx)
+            if kind == "map":
+                materials.assign_materials(
+                    new_obj.data, [this_obj.material], os.path.dirname(file_path)
+                )
+            upgraded.append(idx)
+
+        # The preview keeps only the points of objects still not imported
+        if obj.mode == "EDIT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+        positions = np.zeros(count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", positions)
+        keep = ~np.isin(indices, upgraded)
+        if keep.any():
+            set_points(mesh, positions.reshape(-1, 3)[keep], indices[keep])
+        else:
+            bpy.data.batch_remove([obj, mesh])
+
+        report_sanitation(self)
+        self.report({"INFO"}, f"Imported {len(upgraded)} objects")
+        return {"FINISHED"}
@@ -0,0 +1,36 @@
+# preview\utils.py
+"""Position-only decoding of mesh files for point previews (no bpy)."""
+
+import numpy as np
+
+from .. import tools
+from ..log import log
+
+
+def sample_positions(data, blocks, ratio=1.0, seed=0):
+    """Vertex positions of located blocks, read through strided views
+
+    Only the first 12 bytes of every vertex record are touched. ratio < 1
+    keeps a random share of every block. Returns (float32 positions (N, 3),
+    int32 submesh indices (N,)); non-finite positions are dropped.
+    """
+    rng = np.random.default_rng(seed)
+    positions = []
+    indices = []
+    for block in blocks:
+        count, stride, offset = block["vertex_count"], block["stride"], block["vertices_offset"]
+        if count == 0 or stride < 12 or offset + (count - 1) * stride + 12 > len(data):
+            log.debug("! Skipping vertex block %s", block["index"])
+            continue
+        view = tools.strided_view(data, "<f4", count, stride, offset, 3)
+        if ratio < 1.0:
+            view = view[rng.random(count) < ratio]
+        positions.append(view)
+        indices.append(np.full(len(view), block["index"], dtype=np.int32))
+
+    if not positions:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32)
+    positions = np.concatenate(positions).astype(np.float32)
+    indices = np.concatenate(indices)
+    finite = np.isfinite(positions).all(axis=1)
+    return positions[finite], indices[finite]
@@ -0,0 +1,168 @@
+# reimport\operator.py
+import json
+import os
+from collections import Counter
+
+import bpy
+
+from .. import builder
+from ..anim import reader as anim_reader
+from ..anim.operator import write_track
+from ..catalog import utils as catalog_utils
+from ..log import log
+
+
+class ReimportClass(bpy.types.Operator):
+    """Update the objects and actions of earlier imports from their changed source files"""
+
+    bl_idname = "import.pmt_reimport"
+    bl_label = "Reimport Changed Sources"
+    bl_options = {"REGISTER", "UNDO"}
+
+    # Source to reimport; empty for the sources of the selected objects
+    filepath: bpy.props.StringProperty(
+        subtype="FILE_PATH", default="", options={"HIDDEN", "SKIP_SAVE"}
+    )  # type: ignore
+    # Create objects for submeshes the file gained
+    add_new: bpy.props.BoolProperty(
+        name="Add New Submeshes",
+        description="Create objects for submeshes that the earlier import did not have",
+        default=False,
+    )  # type: ignore
+
+    def execute(self, context):
+        sources = [self.filepath] if self.filepath else selected_sources(context)
+        if not sources:
+            self.report({"ERROR"}, "Select objects created by an import")
+            return {"CANCELLED"}
+
+        totals = Counter()
+        for file_path in sources:
+            if not os.path.isfile(file_path):
+                self.report({"WARNING"}, f"Missing source: {file_path}")
+                continue
+            totals.update(reimport_file(context, file_path, self.add_new))
+        builder.report_sanitation(self)
+
+        self.report(
+            {"INFO"},
+            ", ".join(f"{key} {value}" for key, value in sorted(totals.items())) or "Nothing to do",
+        )
+        return {"FINISHED"}
+
+
+def selected_sources(context):
+    """Source files of the selected objects and of their actions"""
+    sources = []
+    for obj in context.selected_objects:
+        action = obj.animation_data.action if obj.animation_data else None
+        for block in (obj, action):
+            if block is not None and block.get("pmt_source") and block["pmt_source"] not in sources:
+                sources.append(block["pmt_source"])
+    return sources
+
+
+def reimport_file(context, file_path, add_new=False):
+    """Bring everything imported from file_path up to date, returning counts"""
+    log.debug(">>> Reimport: %s", file_path)
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    kind = catalog_utils.detect_kind(file_path, data)
+    if kind == "anim":
+        return reimport_anim(file_path, data)
+    if kind == "skel":
+        # Bones are edited by hand after import; leave them alone
+        return Counter(skipped=1)
+    return reimport_meshes(context, file_path, kind, data, add_new)
+
+
+def reimport_meshes(context, file_path, kind, data, add_new=False):
+    """Update, rebuild, remove and add the objects of one mesh file"""
+    by_index = catalog_utils.decode_indexed(kind, data)
+
+    counts = Counter()
+    seen = set()
+    stale_objects = []
+    old_meshes = []
+    for obj in [o for o in bpy.data.objects if o.get("pmt_source") == file_path]:
+        if obj.type != "MESH" or "pmt_submesh" not in obj:
+            # Placeholders and merged meshes have no single submesh
+            counts["skipped"] += 1
+            continue
+        index = obj["pmt_submesh"]
+        seen.add(index)
+        this_obj = by_index.get(index)
+        if this_obj is None:
+            # The submesh is gone from the file
+            stale_objects.append(obj)
+            continue
+
+        old_hash, weld_distance = builder.split_key(obj.data.get("pmt_hash"))
+        if old_hash == this_obj.hash:
+            counts["unchanged"] += 1
+            continue
+
+        # Same new data elsewhere in this or an earlier import
+        cached = builder.find_cached_mesh(builder.mesh_key(this_obj, weld_distance))
+        if cached is not None:
+            old_meshes.append(obj.data)
+            obj.data = cached
+            counts["updated"] += 1
+        elif weld_distance == 0 and obj.data.users == 1 and builder.update_mesh(obj.data, this_obj):
+            counts["updated"] += 1
+        else:
+            old_meshes.append(builder.replace_mesh(obj, this_obj, weld_distance))
+            counts["rebuilt"] += 1
+        if "pmt_lod" in obj:
+            # The shown level of a LOD set is the one that was reimported
+            obj[f"pmt_lod{obj['pmt_lod']}"] = obj.data
+
+    if add_new:
+        for index, this_obj in by_index.items():
+            if index in seen:
+                continue
+            name = f"{this_obj.name or os.path.splitext(os.path.basename(file_path))[0]}_{index}"
+            new_obj = builder.build_mesh_object(context, name, this_obj)
+            builder.tag_object(new_obj, file_path, index)
+            counts["added"] += 1
+
+    # Delete in one call instead of one update per datablock
+    old_meshes.extend(obj.data for obj in stale_objects)
+    if stale_objects:
+        bpy.data.batch_remove(stale_objects)
+        counts["removed"] += len(stale_objects)
+    orphans = {mesh for mesh in old_meshes if mesh.users == 0}
+    if orphans:
+        bpy.data.batch_remove(orphans)
+
+    log.debug("<<< Reimported %s: %s", file_path, dict(counts))
+    return counts
+
+
+def reimport_anim(file_path, data):
+    """Rewrite the keys of every action imported from an animation file"""
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    counts = Counter()
+    for action in [a for a in bpy.data.actions if a.get("pmt_source") == file_path]:
+        # Decode with the options of the original import
+        options = json.loads(action.get("pmt_options", "{}"))
+        tracks = anim_reader.prepare_tracks(data, file_name, options)[0]
+
+        group_name = action.get("pmt_group")
+        if group_name is not None:
+            # Proxy object action
+            if group_name in tracks:
+                write_track(action, "", group_name, tracks[group_name])
+                counts["updated"] += 1
+            continue
+
+        # Armature action: one F-Curve group per keyed bone
+        bones = {group.name.lower(): group.name for group in action.groups}
+        for track_name, track in tracks.items():
+            bone = bones.get(track_name.lower())
+            if bone is not None:
+                prefix = f'pose.bones["{bpy.utils.escape_identifier(bone)}"].'
+                write_track(action, prefix, bone, track)
+        counts["updated"] += 1
+    return counts
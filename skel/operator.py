@@ -1,10 +1,11 @@
 # skel\operator.py
 import os
-import struct
 
 import bpy
+import numpy as np
 
-from . import utils
+from . import reader, utils
+from .. import tools
 from ..log import log
 
 
@@ -39,76 +40,19 @@ class ImportSkelClass(bpy.types.Operator):
             # Extract file name
             file_name = os.path.splitext(os.path.basename(file_path))[0]
 
-            # Bone names and hierarchy
-            bones = []
-            # Bone transform data
-            transforms = []
-
-            # Read skeleton info
-            with open(file_path, "rb") as file:
-                # Validate the file
-                if not utils.validate_file(file):
-                    log.debug("Invalid file format")
-                    return {"CANCELLED"}
-
-                # Read bone names and hierarchy
-                log.debug("Reading bone names and hierarchy")
-                while True:
-                    # Get current file position
-                    current_position = file.tell()
-                    # Read bone info
-                    bone_info = utils.read_bone_info(file)
-
-                    # Break if read fails
-                    if bone_info is None:
-                        log.debug("Failed to read bone info")
-                        break
-
-                    # Append bone info
-                    name, level = bone_info
-                    bones.append((name, level))
-
-                    # Check for end of name section
-                    # Get current file position
-                    current_position = file.tell()
-                    # Read next bone name length
-                    next_name_length = struct.unpack("<I", file.read(4))[0]
-                    # Skip 23 bytes (+4 previous) each block is 28 bytes
-                    file.seek(23, 1)
-                    # Read end tag
-                    end_tag = file.read(1).hex()
-                    # Restore file position
-                    file.seek(current_position)
-
-                    log.debug("Next name length: %s end tag: %s", next_name_length, end_tag)
-
-                    # Check if end of name section reached
-                    if next_name_length <= 0 and end_tag == "3f":
-                        log.debug("Finished reading bone info: %s", len(bones))
-                        break
-
-                log.debug("Reading bone transforms")
-                log.debug("Current file offset: %s", current_position)
-                # Read bone transform data
-                bones_len = len(bones)
-                # Iterate to read transform data
-                for i in range(bones_len):
-                    log.debug(
-                        "%s reading transform for %s level %s",
-                        i + 1 ,bones[i][0],bones[i][1]
-                    )
-
-                    # Read transform
-                    transform = utils.read_bone_transform(file)
-                    # Stop loop on failure
-                    if transform is None:
-                        break
-                    # Append transform
-                    transforms.append(transform)
-
-                log.debug("Finished reading bone transforms: %s", len(transforms))
-                # Print bone hierarchy
-                utils.print_hierarchy(bones)
+            # Decode bone names, hierarchy and transforms
+            try:
+                skeleton = reader.read_skeleton_file(file_path)
+            except ValueError:
+                log.debug("Invalid file format")
+                return {"CANCELLED"}
+            bones = list(zip(skeleton["names"], skeleton["levels"].tolist()))
+            transforms = [
+                (tuple(head), tuple(tail), 0.0)
+                for head, tail in zip(skeleton["heads"].tolist(), skeleton["tails"].tolist())
+            ]
+            # Print bone hierarchy
+            utils.print_hierarchy(bones)
 
             # Create armature
             log.debug("Creating armature")
@@ -154,3 +98,116 @@ class ImportSkelClass(bpy.types.Operator):
         except Exception as e:
             log.debug("Error during import: %s", str(e))
             return {"CANCELLED"}
+
+
+class BindSkinClass(bpy.types.Operator):
+    """Bind selected meshes to the active armature by nearest bones"""
+
+    bl_idname = "import.skel_bind"
+    bl_label = "Bind Meshes to Skeleton"
+    bl_options = {"REGISTER", "UNDO"}
+
+    # Bones influencing every vertex
+    influences: bpy.props.IntProperty(
+        name="Bones per Vertex",
+        description="Number of nearest bones every vertex is weighted to",
+        default=2,
+        min=1,
+        max=4,
+    )  # type: ignore
+    # Distance falloff exponent
+    falloff: bpy.props.FloatProperty(
+        name="Falloff",
+        description="Weights fall off with distance to this power",
+        default=2.0,
+        min=0.1,
+        max=8.0,
+    )  # type: ignore
+    # Replace weights that were imported with the mesh
+    overwrite: bpy.props.BoolProperty(
+        name="Overwrite Weights",
+        description="Recompute weights of meshes that already have groups named after bones",
+        default=False,
+    )  # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        armature_obj = context.active_object
+        return (
+            armature_obj is not None
+            and armature_obj.type == "ARMATURE"
+            and any(obj.type == "MESH" for obj in context.selected_objects)
+        )
+
+    def execute(self, context):
+        """Weight and bind the selected meshes"""
+        armature_obj = context.active_object
+        bones = armature_obj.data.bones
+        bone_names = [bone.name for bone in bones]
+        if not bone_names:
+            self.report({"ERROR"}, "Armature has no bones")
+            return {"CANCELLED"}
+
+        # Bone segments in world space
+        heads = np.empty(len(bones) * 3, dtype=np.float32)
+        tails = np.empty(len(bones) * 3, dtype=np.float32)
+        bones.foreach_get("head_local", heads)
+        bones.foreach_get("tail_local", tails)
+        armature_matrix = np.array(armature_obj.matrix_world, dtype=np.float32)
+        heads = to_world(armature_matrix, heads.reshape(-1, 3))
+        tails = to_world(armature_matrix, tails.reshape(-1, 3))
+
+        bound = 0
+        for obj in context.selected_objects:
+            if obj.type != "MESH":
+                continue
+
+            # Keep weights imported with the mesh unless asked otherwise
+            weighted = any(group.name in bones for group in obj.vertex_groups)
+            if self.overwrite or not weighted:
+                self.weight_mesh(obj, bone_names, heads, tails)
+
+            # Deform with the armature, keeping the world transform
+            modifier = next(
+                (m for m in obj.modifiers if m.type == "ARMATURE" and m.object == armature_obj),
+                None,
+            )
+            if modifier is None:
+                modifier = obj.modifiers.new(name="Armature", type="ARMATURE")
+                modifier.object = armature_obj
+            world = obj.matrix_world.copy()
+            obj.parent = armature_obj
+            obj.matrix_world = world
+            bound += 1
+
+        log.debug("<<< Bound %s meshes to %s", bound, armature_obj.name)
+        self.report({"INFO"}, f"Bound {bound} meshes to {armature_obj.name}")
+        return {"FINISHED"}
+
+    def weight_mesh(self, obj, bone_names, heads, tails):
+        """Write nearest-bone weights of one mesh"""
+        mesh = obj.data
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        co = to_world(np.array(obj.matrix_world, dtype=np.float32), co.reshape(-1, 3))
+
+        bone_indices, bone_weights = utils.nearest_bone_weights(
+            co, heads, tails, self.influences, self.falloff
+        )
+
+        # Start from empty bone groups
+        for group in list(obj.vertex_groups):
+            if group.name in bone_names:
+                obj.vertex_groups.remove(group)
+        groups = [obj.vertex_groups.new(name=name) for name in bone_names]
+
+        # One add() call per (bone, weight) run
+        runs = tools.group_skin(bone_indices, bone_weights)
+        for bone, weight, vertex_ids in runs:
+            groups[bone].add(vertex_ids.tolist(), weight, "REPLACE")
+        log.debug("> Weighted %s vertices of %s in %s runs", len(co), obj.name, len(runs))
+
+
+def to_world(matrix, points):
+    """Transform (N, 3) points by a 4x4 matrix"""
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
@@ -0,0 +1,82 @@
+# skel\reader.py
+"""Decode .skel files into NumPy arrays (no bpy)."""
+
+import struct
+
+import numpy as np
+
+from .. import tools
+from ..log import log
+
+# File signature
+SKEL_HEADER = b"\xFF\xFF\xFF\xFF\x00\x00\x00\x00\x00\x00\x00\x00"
+# Bytes per bone transform: head f32 x3, tail f32 x3, end tag f32
+TRANSFORM_SIZE = 0x1C
+
+
+def read_skeleton(data):
+    """Decode bone names, levels, parents, heads and tails of a skel file
+
+    Heads and tails stay in file coordinates. Parents follow the armature
+    importer: the nearest bone (by head) one level up, -1 for roots.
+    """
+    if data[:12] != SKEL_HEADER:
+        raise ValueError("Not a skel file")
+
+    # Bone names and hierarchy
+    names = []
+    levels = []
+    offset = 12
+    while offset + 4 <= len(data):
+        name_length = struct.unpack_from("<I", data, offset)[0]
+        if offset + 8 + name_length > len(data):
+            log.debug("Failed to read bone info at %s", offset)
+            break
+        names.append(data[offset + 4: offset + 4 + name_length].decode("ascii"))
+        levels.append(struct.unpack_from("<I", data, offset + 4 + name_length)[0])
+        offset += 8 + name_length
+
+        # End of the name section: the transform block follows, recognised by
+        # a zero first word and the 0x3f top byte of its end tag
+        if offset + TRANSFORM_SIZE > len(data):
+            break
+        next_name_length = struct.unpack_from("<I", data, offset)[0]
+        if next_name_length <= 0 and data[offset + 27] == 0x3F:
+            break
+
+    # Bone transforms, as many as the file holds
+    count = min(len(names), (len(data) - offset) // TRANSFORM_SIZE)
+    heads = tools.strided_view(data, "<f4", count, TRANSFORM_SIZE, offset, 3).astype(np.float32)
+    tails = tools.strided_view(data, "<f4", count, TRANSFORM_SIZE, offset + 12, 3).astype(np.float32)
+    names = names[:count]
+    levels = np.asarray(levels[:count], dtype=np.int32)
+    log.debug("Read %s bones", count)
+
+    return {
+        "names": names,
+        "levels": levels,
+        "parents": find_parents(levels, heads),
+        "heads": heads,
+        "tails": tails,
+    }
+
+
+def find_parents(levels, heads):
+    """Parent of every bone: the bone one level up with the nearest head"""
+    parents = np.full(len(levels), -1, dtype=np.int32)
+    for level in np.unique(levels):
+        children = np.flatnonzero(levels == level)
+        candidates = np.flatnonzero(levels == level - 1)
+        if level <= 1 or not len(candidates):
+            continue
+        distances = np.linalg.norm(
+            heads[children][:, None, :] - heads[candidates][None, :, :], axis=2
+        )
+        parents[children] = candidates[np.argmin(distances, axis=1)]
+    return parents
+
+
+def read_skeleton_file(file_path):
+    """Decode a skel file from disk"""
+    with open(file_path, "rb") as file:
+        return read_skeleton(file.read())
@@ -2,6 +2,7 @@
 import math
 import struct
 
+import numpy as np
 from mathutils import Vector
 
 from ..log import log
@@ -141,3 +142,46 @@ def add_bone_constraints(armature_obj):
                 constraint = pose.bones[target_name].constraints.new("IK")
                 constraint.target = armature_obj
                 constraint.subtarget = bone_name
+
+
+def segment_distances(points, heads, tails):
+    """Distance of every point to every bone segment, shape (points, bones)"""
+    segments = tails - heads
+    length2 = (segments * segments).sum(axis=1)
+    # Zero-length bones behave like points
+    length2[length2 == 0] = 1.0
+
+    # Project onto every segment and clamp to its ends
+    relative = points[:, None, :] - heads[None, :, :]
+    t = np.clip((relative * segments).sum(axis=2) / length2, 0.0, 1.0)
+    closest = heads[None, :, :] + t[:, :, None] * segments[None, :, :]
+    return np.linalg.norm(points[:, None, :] - closest, axis=2)
+
+
+def nearest_bone_weights(points, heads, tails, influences=2, falloff=2.0, chunk_size=4096):
+    """Weight every point to its nearest bone segments by inverse distance
+
+    Returns (bone indices, weights), both shaped (points, influences).
+    Points are processed in chunks to bound the (points, bones) temporaries.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    heads = np.asarray(heads, dtype=np.float32).reshape(-1, 3)
+    tails = np.asarray(tails, dtype=np.float32).reshape(-1, 3)
+    count = min(influences, len(heads))
+    indices = np.zeros((len(points), count), dtype=np.int32)
+    weights = np.zeros((len(points), count), dtype=np.float32)
+
+    for start in range(0, len(points), chunk_size):
+        distances = segment_distances(points[start: start + chunk_size], heads, tails)
+        # Nearest bones of every point, unordered
+        nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+
+        # Inverse distance weights, normalized per point
+        chunk_weights = 1.0 / np.maximum(nearest_distances, 1e-6) ** falloff
+        chunk_weights /= chunk_weights.sum(axis=1, keepdims=True)
+
+        indices[start: start + len(nearest)] = nearest
+        weights[start: start + len(nearest)] = chunk_weights
+
+    return indices, weights
@@ -1,6 +1,9 @@
 # tools.py
+import hashlib
 import struct
 
+import numpy as np
+
 
 def read_half_float(data, offset):
     """Read a half-precision floating point number."""
@@ -18,3 +21,379 @@ def read_half_float(data, offset):
             return ((-1) ** sign) * (2 ** (exponent - 15)) * (1 + mantissa / 1024)
     except:
         return 0.0
+
+
+def strided_view(data, dtype, count, stride, offset, width, item_stride=None):
+    """Return a zero-copy (count, width) view over interleaved records."""
+    dtype = np.dtype(dtype)
+    if item_stride is None:
+        item_stride = dtype.itemsize
+    return np.ndarray(
+        shape=(count, width),
+        dtype=dtype,
+        buffer=data,
+        offset=offset,
+        strides=(stride, item_stride),
+    )
+
+
+def half_to_float(values):
+    """Convert half floats to float32, mapping special values to 0.0 like read_half_float."""
+    values = values.astype(np.float32)
+    values[~np.isfinite(values)] = 0.0
+    return values
+
+
+def decode_vertex_block(vertices_data, count, block_size, uv_offset):
+    """Decode positions, normals and UVs of a vertex block in one pass."""
+    # Positions are the first three floats of every record
+    vertices = strided_view(vertices_data, "<f4", count, block_size, 0, 3).copy()
+    # Normals are three half floats right after the position
+    normals = half_to_float(strided_view(vertices_data, "<f2", count, block_size, 0x0C, 3))
+    # UVs are two half floats near the end of the record, V is flipped
+    uvs = half_to_float(strided_view(vertices_data, "<f2", count, block_size, uv_offset, 2))
+    uvs[:, 1] = 1 - uvs[:, 1]
+
+    return vertices, normals, uvs
+
+
+# Extra vertex attributes by record stride: name -> (offset, dtype, width)
+VERTEX_LAYOUTS = {
+    # Weapon/character records: position, normal, tangents, skin, UV
+    64: {
+        "bone_indices": (36, "u1", 4),
+        "bone_weights": (40, "<f4", 4),
+    },
+}
+
+# Bone index of unused influence slots
+UNUSED_BONE = 0xFF
+
+
+def decode_skin(vertices_data, count, block_size):
+    """Decode bone indices and weights of a vertex block, or None when the stride has no skin."""
+    layout = VERTEX_LAYOUTS.get(block_size, {})
+    if "bone_indices" not in layout or "bone_weights" not in layout:
+        return None
+
+    offset, dtype, width = layout["bone_indices"]
+    bone_indices = strided_view(vertices_data, dtype, count, block_size, offset, width)
+    bone_indices = bone_indices.astype(np.int32)
+    offset, dtype, width = layout["bone_weights"]
+    bone_weights = strided_view(vertices_data, dtype, count, block_size, offset, width)
+    bone_weights = bone_weights.astype(np.float32)
+
+    # Unused slots never carry weight
+    bone_weights[bone_indices == UNUSED_BONE] = 0.0
+    return bone_indices, bone_weights
+
+
+def group_skin(bone_indices, bone_weights, precision=4):
+    """Group skin influences into (bone, weight, vertex indices) runs
+
+    Weights are rounded to precision decimals so every run can be written
+    with a single VertexGroup.add call instead of one call per vertex.
+    """
+    width = bone_indices.shape[1]
+    vertex_ids = np.repeat(np.arange(len(bone_indices), dtype=np.int64), width)
+    bones = bone_indices.ravel()
+    weights = np.round(bone_weights.ravel(), precision)
+
+    # Drop zero weights (unused slots never carry weight)
+    used = weights > 0
+    vertex_ids, bones, weights = vertex_ids[used], bones[used], weights[used]
+    if not len(bones):
+        return []
+
+    # Sort by (bone, weight) and cut where either changes
+    order = np.lexsort((weights, bones))
+    vertex_ids, bones, weights = vertex_ids[order], bones[order], weights[order]
+    cuts = np.flatnonzero((np.diff(bones) != 0) | (np.diff(weights) != 0)) + 1
+    starts = np.concatenate(([0], cuts))
+    ends = np.concatenate((cuts, [len(bones)]))
+
+    return [
+        (int(bones[start]), float(weights[start]), vertex_ids[start:end])
+        for start, end in zip(starts, ends)
+    ]
+
+
+def decode_faces(faces_data_block, index_length):
+    """Decode triangles stored as 12-byte records (one u16 per 4 bytes)."""
+    count = index_length // 12
+    faces = strided_view(faces_data_block, "<u2", count, 12, 0, 3, item_stride=4)
+    return faces.astype(np.uint32)
+
+
+def check_face_block(faces_data_block, index_length):
+    """Return (misaligned records, trailing bytes) of a face block.
+
+    The upper half of every 4-byte index slot is zero in well-formed data,
+    so records with non-zero upper halves were read at the wrong stride or
+    offset rather than holding large indices.
+    """
+    count = index_length // 12
+    if count == 0 or len(faces_data_block) < 2:
+        # No whole record, or not even the first upper half to look at
+        return 0, index_length % 12
+    high = strided_view(faces_data_block, "<u2", count, 12, 2, 3, item_stride=4)
+    return int(np.count_nonzero(high.any(axis=1))), index_length % 12
+
+
+def sanitize_submesh(this_obj):
+    """Drop faces Blender would reject and zero non-finite vertex data, in bulk.
+
+    Faces with out-of-range indices, repeated vertices, or the same three
+    vertices as an earlier face are removed; NaN/Inf positions, normals and
+    UVs become 0. Returns (submesh, counts); the submesh is this_obj itself
+    when nothing needed fixing.
+    """
+    counts = {}
+    fixed = {}
+
+    # Non-finite values from broken float or half-float data
+    for field in ("vertices", "normals", "uvs"):
+        values = getattr(this_obj, field)
+        bad = ~np.isfinite(values).all(axis=1)
+        if bad.any():
+            values = values.copy()
+            values[bad] = 0.0
+            fixed[field] = values
+            counts[f"non-finite {field}"] = int(bad.sum())
+
+    faces = this_obj.faces
+    out_of_range = (faces >= len(this_obj.vertices)).any(axis=1)
+    degenerate = (
+        (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 0] == faces[:, 2])
+    ) & ~out_of_range
+    keep = ~(out_of_range | degenerate)
+
+    # Duplicates: the same vertex set in any winding, first one kept
+    kept_ids = np.flatnonzero(keep)
+    duplicates = 0
+    if len(kept_ids):
+        _, first = np.unique(np.sort(faces[kept_ids], axis=1), axis=0, return_index=True)
+        duplicates = len(kept_ids) - len(first)
+        if duplicates:
+            keep[:] = False
+            keep[kept_ids[first]] = True
+
+    for name, count in (
+        ("out-of-range faces", int(out_of_range.sum())),
+        ("degenerate faces", int(degenerate.sum())),
+        ("duplicate faces", duplicates),
+    ):
+        if count:
+            counts[name] = count
+
+    if not counts:
+        return this_obj, counts
+
+    if not keep.all():
+        fixed["faces"] = faces[keep]
+        loops = np.repeat(keep, 3)
+        if this_obj.face_materials is not None:
+            fixed["face_materials"] = np.asarray(this_obj.face_materials)[keep]
+        if this_obj.loop_uvs is not None:
+            fixed["loop_uvs"] = this_obj.loop_uvs[loops]
+            fixed["loop_normals"] = this_obj.loop_normals[loops]
+    return this_obj.replace(**fixed), counts
+
+
+class SubMesh:
+    """One decoded object: contiguous NumPy arrays plus header metadata"""
+
+    __slots__ = (
+        # Geometry, (N, 3) float32 / (F, 3) uint32 / (N, 3) float32 / (N, 2) float32
+        "vertices",
+        "faces",
+        "normals",
+        "uvs",
+        # Header metadata
+        "mesh_obj_number",
+        "mesh_matrices_number",
+        "mesh_byte_size",
+        "faces_size",
+        # Identity
+        "name",
+        "index",
+        "hash",
+        "material",
+        # Per face corner data of welded meshes
+        "loop_uvs",
+        "loop_normals",
+        # Skinning, (N, 4) int32 / (N, 4) float32 and the bone name table
+        "bone_indices",
+        "bone_weights",
+        "bone_names",
+        # Merged meshes
+        "submesh_ids",
+        "face_materials",
+        "materials",
+    )
+
+    def __init__(self, vertices, faces, normals, uvs, **fields):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.faces = np.ascontiguousarray(faces, dtype=np.uint32).reshape(-1, 3)
+        self.normals = np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+        self.uvs = np.ascontiguousarray(uvs, dtype=np.float32).reshape(-1, 2)
+        for field in self.__slots__[4:]:
+            setattr(self, field, fields.pop(field, None))
+        if fields:
+            raise TypeError(f"Unknown SubMesh fields: {', '.join(fields)}")
+
+    def __repr__(self):
+        return f"<SubMesh {self.name or self.index} {len(self.vertices)}v {len(self.faces)}f>"
+
+    def replace(self, **fields):
+        """Return a shallow copy with some fields replaced"""
+        copy = SubMesh.__new__(SubMesh)
+        for field in self.__slots__:
+            setattr(copy, field, fields.pop(field, getattr(self, field)))
+        if fields:
+            raise TypeError(f"Unknown SubMesh fields: {', '.join(fields)}")
+        return copy
+
+
+def content_hash(layout, *blocks):
+    """Hash raw data blocks to find byte-identical meshes
+
+    layout is a tuple such as (decoder, vertex stride, UV offset): the same
+    bytes read another way decode to another mesh, so it is hashed too. Every
+    block is prefixed with its length so block boundaries count as well.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(layout).encode("utf-8"))
+    for block in blocks:
+        digest.update(len(block).to_bytes(8, "little"))
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def weld_vertices(vertices, faces, distance):
+    """Merge vertices closer than distance, returning (vertices, faces, corner_faces, kept)
+
+    Positions are quantized to the weld distance and deduplicated with
+    np.unique. Faces are remapped to the welded vertices; faces that collapse
+    onto fewer than three distinct vertices are dropped. corner_faces holds
+    the original indices of the kept faces so per-corner data (UVs, normals)
+    can still be looked up on the unwelded arrays; kept masks the surviving faces.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+
+    # Quantize positions and find unique cells
+    keys = np.round(vertices / distance).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # Keep welded vertices in order of first appearance
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    welded = vertices[first[order]]
+    remap = rank[inverse]
+
+    # Remap faces and drop collapsed ones
+    new_faces = remap[faces]
+    kept = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 2] != new_faces[:, 0])
+    )
+
+    return welded, new_faces[kept].astype(np.uint32), faces[kept], kept
+
+
+# Image file extensions used by texture paths
+TEXTURE_EXTENSIONS = (".dds", ".tga", ".png", ".jpg", ".jpeg", ".bmp")
+
+
+def read_strings(block):
+    """Find length-prefixed ASCII strings, returning (offset, end, text) tuples"""
+    block_len = len(block)
+    if block_len < 5:
+        return []
+
+    # Every offset whose u32 could be a string length
+    lengths = np.ndarray(shape=(block_len - 3,), dtype="<u4", buffer=block, strides=(1,))
+    candidates = np.flatnonzero((lengths > 0) & (lengths <= 260))
+    # Running count of non-printable bytes, to test a whole range at once
+    raw = np.frombuffer(block, dtype=np.uint8)
+    non_printable = np.concatenate(([0], np.cumsum((raw < 0x20) | (raw >= 0x7F))))
+
+    strings = []
+    index = 0
+    for offset in candidates.tolist():
+        if offset < index:
+            continue
+        start = offset + 4
+        end = start + int(lengths[offset])
+        if end <= block_len and non_printable[end] == non_printable[start]:
+            strings.append((offset, end, bytes(block[start:end]).decode("ascii")))
+            index = end
+    return strings
+
+
+def is_texture_path(text):
+    """Check whether a string looks like a texture path"""
+    return "/" in text or "\\" in text or text.lower().endswith(TEXTURE_EXTENSIONS)
+
+
+def parse_material_block(block):
+    """Decode the shader/texture region that follows an object's faces
+
+    The layout is only partly known: it holds length-prefixed shader names,
+    then texture slots as (slot name, path) string pairs, with counts and
+    flags in between. Strings are recovered by scanning; bytes between them
+    are kept as raw parameters for inspection only. Their meaning is unknown,
+    so the hash that identifies the material covers the shaders and texture
+    slots alone.
+    """
+    strings = read_strings(block)
+    if not strings:
+        return None
+
+    shaders = []
+    textures = []
+    params = []
+    previous_end = 0
+    i = 0
+    while i < len(strings):
+        offset, end, text = strings[i]
+        # Raw bytes between strings
+        if offset > previous_end:
+            params.append(bytes(block[previous_end:offset]).hex())
+
+        # "slot name" followed by "path" is a texture slot
+        if (
+            i + 1 < len(strings)
+            and not is_texture_path(text)
+            and is_texture_path(strings[i + 1][2])
+            and strings[i + 1][0] == end
+        ):
+            texture = (text, strings[i + 1][2])
+            if texture not in textures:
+                textures.append(texture)
+            previous_end = strings[i + 1][1]
+            i += 2
+            continue
+
+        if is_texture_path(text):
+            texture = ("", text)
+            if texture not in textures:
+                textures.append(texture)
+        elif text not in shaders:
+            shaders.append(text)
+        previous_end = end
+        i += 1
+
+    descriptor = {
+        "shaders": tuple(shaders),
+        "textures": tuple(textures),
+        "params": tuple(params),
+    }
+    descriptor["hash"] = content_hash(
+        ("material",), repr((descriptor["shaders"], descriptor["textures"])).encode("utf-8")
+    )
+    return descriptor
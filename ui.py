@@ -1,6 +1,8 @@
 # ui.py
 import bpy
 
+from .watch.operator import is_watching
+
 
 class ImportPanel(bpy.types.Panel):
     """Import panel."""
@@ -16,8 +18,45 @@ class ImportPanel(bpy.types.Panel):
         layout.label(text="Import MESH")
         layout.operator("import.mesh_prop", text="Prop Model")
         layout.operator("import.mesh_map", text="Map Model")
+        layout.operator("import.mesh_map_expand", text="Expand Placeholders")
         layout.operator("import.wcm_mesh", text="Weapon/Character Model")
+        layout.operator("import.pmt_lod_set", text="LOD Set")
+        row = layout.row(align=True)
+        row.operator("import.pmt_preview", text="Point Preview")
+        row.operator("import.pmt_preview_upgrade", text="Upgrade Selection")
+        row = layout.row(align=True)
+        op = row.operator("import.pmt_lod_swap", text="Finest LOD")
+        op.mode = "LEVEL"
+        op.level = 0
+        op = row.operator("import.pmt_lod_swap", text="LOD by Camera")
+        op.mode = "CAMERA"
+        layout.operator("import.pmt_reimport", text="Reimport Selected", icon="FILE_REFRESH")
+        if is_watching():
+            layout.operator("import.pmt_watch", text="Stop Watching", icon="PAUSE")
+        else:
+            layout.operator("import.pmt_watch", text="Watch Folder", icon="HIDE_OFF")
         layout.label(text="Import ANIM")
         layout.operator("import.anim", text="Import Animation", icon="IMPORT")
         layout.label(text="Import SKEL")
         layout.operator("import.skel", text="Import Skeleton", icon="IMPORT")
+        layout.operator("import.skel_bind", text="Bind Selected Meshes", icon="ARMATURE_DATA")
+
+        # Asset catalog
+        settings = context.scene.pmt_catalog
+        layout.label(text="Asset Catalog")
+        layout.prop(settings, "database")
+        layout.operator("import.pmt_catalog_scan", text="Scan Folder", icon="FILE_REFRESH")
+        row = layout.row(align=True)
+        row.prop(settings, "search_text", text="")
+        row.prop(settings, "search_kind", text="")
+        row.operator("import.pmt_catalog_search", text="", icon="VIEWZOOM")
+        for item in settings.results[:25]:
+            row = layout.row()
+            row.label(text=item.detail)
+            op = row.operator("import.pmt_catalog_import", text="", icon="IMPORT")
+            op.filepath = item.name
+            op.kind = item.kind
+
+        # Batch conversion
+        layout.label(text="Batch")
+        layout.operator("import.pmt_batch_convert", text="Convert Folder", icon="FILE_REFRESH")
@@ -0,0 +1,112 @@
+# watch\operator.py
+import os
+
+import bpy
+
+from . import utils
+from .. import builder
+from ..log import log
+from ..reimport.operator import reimport_file
+
+# Active watcher, one per Blender session
+_watcher = None
+
+
+def is_watching():
+    """Whether a folder is being watched"""
+    return _watcher is not None and _watcher.running
+
+
+def stop_watching():
+    """Stop the active watcher, if any"""
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+    if bpy.app.timers.is_registered(sync_changes):
+        bpy.app.timers.unregister(sync_changes)
+
+
+def imported_sources():
+    """Stored source paths of the objects and actions in the file, keyed by absolute path"""
+    sources = {}
+    for block in (*bpy.data.objects, *bpy.data.actions):
+        source = block.get("pmt_source")
+        if source:
+            sources.setdefault(os.path.abspath(bpy.path.abspath(source)), source)
+    return sources
+
+
+def sync_changes():
+    """Timer callback: reimport settled changes on the main thread"""
+    if not is_watching():
+        return None
+
+    changed = _watcher.take_settled()
+    if changed:
+        # Only files that something in the scene was imported from
+        sources = imported_sources()
+        for path in changed:
+            source = sources.get(path)
+            if source is None:
+                continue
+            try:
+                counts = reimport_file(bpy.context, source)
+            except Exception as e:
+                # A half-written file is retried on its next change
+                log.debug("! Live reimport of %s failed: %s", path, e)
+                continue
+            log.debug(
+                "> Live reimport of %s: %s, fixes: %s",
+                path, dict(counts), builder.take_sanitation(),
+            )
+    return _watcher.interval
+
+
+class WatchFolderClass(bpy.types.Operator):
+    """Reimport assets of a folder into the open scene whenever they change on disk"""
+
+    bl_idname = "import.pmt_watch"
+    bl_label = "Watch Asset Folder"
+    bl_options = {"REGISTER"}
+
+    # Folder to watch
+    directory: bpy.props.StringProperty(subtype="DIR_PATH", default="")  # type: ignore
+    # Poll interval
+    interval: bpy.props.FloatProperty(
+        name="Interval",
+        description="Seconds between checks of the folder",
+        default=1.0,
+        min=0.1,
+    )  # type: ignore
+    # Debounce time
+    settle: bpy.props.FloatProperty(
+        name="Settle Time",
+        description="Seconds a file must stay unchanged before it is reimported",
+        default=0.5,
+        min=0.0,
+    )  # type: ignore
+
+    def invoke(self, context, event):
+        if is_watching():
+            # The panel button toggles
+            return self.execute(context)
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        global _watcher
+        if is_watching():
+            stop_watching()
+            self.report({"INFO"}, "Stopped watching")
+            return {"FINISHED"}
+
+        if not os.path.isdir(self.directory):
+            self.report({"ERROR"}, "Folder does not exist")
+            return {"CANCELLED"}
+
+        _watcher = utils.FolderWatcher(self.directory, self.interval, self.settle)
+        _watcher.start()
+        bpy.app.timers.register(sync_changes, first_interval=self.interval, persistent=True)
+        self.report({"INFO"}, f"Watching {_watcher.root}")
+        return {"FINISHED"}
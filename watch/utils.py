@@ -0,0 +1,85 @@
+# watch\utils.py
+"""Polling folder watcher with debounced change reports (no bpy)."""
+
+import os
+import threading
+import time
+
+from ..catalog.utils import SCAN_EXTENSIONS
+from ..log import log
+
+
+def snapshot(root):
+    """(mtime_ns, size) of every asset under root, keyed by absolute path"""
+    stamps = {}
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if file_name.lower().endswith(SCAN_EXTENSIONS):
+                path = os.path.abspath(os.path.join(directory, file_name))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Deleted between listing and stat
+                    continue
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class FolderWatcher:
+    """Poll a folder on a worker thread and collect changed assets
+
+    Only stat() calls run per poll. A changed file is handed out by
+    take_settled once it has not changed again for settle seconds, so a
+    burst of writes from an exporter becomes a single change.
+    """
+
+    def __init__(self, root, interval=1.0, settle=0.5):
+        self.root = os.path.abspath(root)
+        self.interval = interval
+        self.settle = settle
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Take the initial snapshot and start polling"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(snapshot(self.root),), daemon=True)
+        self._thread.start()
+        log.debug(">>> Watching %s every %ss", self.root, self.interval)
+
+    def stop(self):
+        """Stop polling and drop pending changes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._pending.clear()
+        log.debug("<<< Stopped watching %s", self.root)
+
+    def _run(self, known):
+        while not self._stop.wait(self.interval):
+            current = snapshot(self.root)
+            changed = [path for path, stamp in current.items() if known.get(path) != stamp]
+            if changed:
+                now = time.monotonic()
+                with self._lock:
+                    for path in changed:
+                        # Every new write restarts the quiet period
+                        self._pending[path] = now
+            known = current
+
+    def take_settled(self):
+        """Return and forget the changed paths that have been quiet for settle seconds"""
+        cutoff = time.monotonic() - self.settle
+        with self._lock:
+            settled = [path for path, changed in self._pending.items() if changed <= cutoff]
+            for path in settled:
+                del self._pending[path]
+        return sorted(settled)